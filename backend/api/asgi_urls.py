@@ -0,0 +1,17 @@
+from django.urls import path
+
+from api import async_views
+from api.urls import urlpatterns as sync_urlpatterns
+
+# Под ASGI чтение справочников обслуживают асинхронные представления,
+# остальные адреса — те же, что и под WSGI. Рецепты без асинхронного ORM
+# читались бы тем же синхронным кодом в потоке, поэтому их адреса общие.
+app_name = 'api'
+
+urlpatterns = [
+    path('tags/', async_views.tag_list, name='tags-list'),
+    path(
+        'ingredients/', async_views.ingredient_list, name='ingredient-list'
+    ),
+    *sync_urlpatterns,
+]
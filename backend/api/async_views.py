@@ -0,0 +1,97 @@
+from functools import wraps
+from urllib.parse import unquote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .autocomplete import ingredient_catalog
+from .catalog import ingredient_list_response, tag_list_response
+from .views import IngredientViewSet, TagViewSet
+
+# Методы, которые обслуживает асинхронная ветка, остальные уходят
+# в синхронное представление.
+READ_METHODS = ('GET', 'HEAD')
+
+
+def in_thread(func):
+    """
+    Синхронная функция как корутина в общем пуле потоков. Соединения
+    с базой в потоках пула живут столько же, сколько в конце обычного
+    запроса: close_old_connections закрывает устаревшие до и после вызова.
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def read_path(sync_view):
+    """
+    Асинхронное представление для ASGI: анонимное чтение выполняет
+    декорированная корутина, запись, прочие методы и запросы с заголовком
+    Authorization — прежнее синхронное представление в потоке пула.
+    Так неверный токен получает тот же ответ 401, что и под WSGI.
+    """
+    run_sync_view = in_thread(sync_view)
+
+    def decorator(read):
+        @wraps(read)
+        async def view(request, *args, **kwargs):
+            if (
+                request.method in READ_METHODS
+                and 'HTTP_AUTHORIZATION' not in request.META
+            ):
+                return await read(request, *args, **kwargs)
+            return await run_sync_view(request, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+    return decorator
+
+
+async def cached(holder):
+    """
+    Содержимое кэша процесса: готовое отдаётся сразу, а сборка из базы
+    при первом обращении или после сброса идёт в потоке.
+    """
+    value = holder.peek()
+    if value is None:
+        value = await in_thread(holder.get)()
+    return value
+
+
+@read_path(
+    TagViewSet.as_view({'get': 'list'}, basename='tags', detail=False)
+)
+async def tag_list(request):
+    """Список тегов из готового ответа процесса."""
+    return (await cached(tag_list_response)).response(request)
+
+
+@read_path(IngredientViewSet.as_view(
+    {'get': 'list'}, basename='ingredient', detail=False
+))
+async def ingredient_list(request):
+    """Справочник и поиск ингредиентов по индексу в памяти процесса."""
+    name = request.GET.get('name')
+    if not name:
+        return (await cached(ingredient_list_response)).response(request)
+    if name.startswith('%'):
+        name = unquote(name)
+    try:
+        limit = max(int(request.GET['limit']), 1)
+    except (KeyError, ValueError):
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+    index = await cached(ingredient_catalog)
+    return HttpResponse(
+        JSONRenderer().render(index.search(name, limit)),
+        content_type='application/json',
+    )
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenUserCache:
+    """
+    Поля пользователя по ключу токена, нужные запросам чтения (см.
+    TokenUser.cached_fields). По умолчанию хранятся в памяти процесса:
+    не больше AUTH_TOKEN_CACHE_SIZE записей, вытесняются давно
+    не использованные, каждая живёт AUTH_TOKEN_CACHE_TTL секунд. Сигналы
+    сбрасывают запись при выходе, смене пароля, деактивации и изменении
+    избранного, покупок и подписок, но только в своём процессе, поэтому
+    другие воркеры видят изменения не позже чем через TTL. Если задан
+    AUTH_TOKEN_CACHE_ALIAS, записи хранятся в этом общем кэше и сбрасываются
+    сразу для всех процессов.
+    """
+
+    key_prefix = 'auth:token:'
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def backend(self):
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def get(self, key):
+        if self.backend is not None:
+            return self.backend.get(self.key_prefix + key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            values, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return values
+
+    def set(self, key, values):
+        if self.backend is not None:
+            self.backend.set(
+                self.key_prefix + key, values,
+                timeout=settings.AUTH_TOKEN_CACHE_TTL,
+            )
+            return
+        with self.lock:
+            self.entries[key] = (
+                values, time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        if self.backend is not None:
+            self.backend.delete_many(
+                [self.key_prefix + key for key in keys]
+            )
+            return
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def forget_users(self, user_ids):
+        """Сбрасывает записи пользователей по их токенам."""
+        self.delete(*Token.objects.filter(user__in=user_ids).values_list(
+            'key', flat=True
+        ))
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    Пользователь по токену из кэша. Id, признаки входа и cached_fields
+    известны без базы, остальные поля читаются из базы при первом
+    обращении: в запрос не попадает устаревший экземпляр, который можно
+    было бы сохранить.
+    """
+    cached_fields = ('id', 'interactions_version')
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, values):
+        super().__init__(
+            lambda: get_user_model()._default_manager.get(pk=values['id'])
+        )
+        self.__dict__.update(values, pk=values['id'])
+
+    @classmethod
+    def values(cls, user):
+        return {name: getattr(user, name) for name in cls.cached_fields}
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к базе на каждый запрос: пользователь
+    берётся из token_users, база читается только при промахе или когда
+    запросу нужны поля пользователя, которых нет в кэше.
+    """
+
+    def authenticate_credentials(self, key):
+        values = token_users.get(key)
+        if values is not None:
+            return TokenUser(values), Token(key=key, user_id=values['id'])
+        user, token = super().authenticate_credentials(key)
+        token_users.set(key, TokenUser.values(user))
+        return user, token
+
+
+token_users = TokenUserCache()
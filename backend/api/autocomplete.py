@@ -0,0 +1,107 @@
+import bisect
+import threading
+import time
+from itertools import chain, islice
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+
+LAYOUT = str.maketrans(
+    "qwertyuiop[]asdfghjkl;'zxcvbnm,./",
+    "йцукенгшщзхъфывапролджэячсмитьбю."
+)
+
+
+class IngredientIndex:
+    """
+    Неизменяемый отсортированный индекс справочника ингредиентов.
+    Ищет и сам запрос, и его перевод из латинской раскладки в русскую,
+    как прежний поиск в базе: сначала совпадения по началу названия,
+    затем по подстроке.
+    """
+
+    def __init__(self, ingredients):
+        entries = sorted(
+            (name.lower(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in ingredients
+        )
+        self.keys = tuple(entry[0] for entry in entries)
+        self.items = tuple(entry[1:] for entry in entries)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, query, limit):
+        """Позиции подходящих записей: префиксные и прочие отдельно."""
+        start = end = bisect.bisect_left(self.keys, query)
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        prefix = list(range(start, min(end, start + limit)))
+        other = []
+        for position, key in enumerate(self.keys):
+            if len(prefix) + len(other) >= limit:
+                break
+            if query in key and not start <= position < end:
+                other.append(position)
+        return prefix, other
+
+    def search(self, query, limit):
+        query = query.lower()
+        found = [
+            self.find(variant, limit)
+            for variant in dict.fromkeys((query, query.translate(LAYOUT)))
+        ]
+        positions = dict.fromkeys(chain(
+            *(prefix for prefix, _ in found), *(other for _, other in found)
+        ))
+        return [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for pk, name, measurement_unit in map(
+                self.items.__getitem__, islice(positions, limit)
+            )
+        ]
+
+
+class IngredientCatalog:
+    """
+    Индекс ингредиентов текущего процесса. Строится при первом обращении,
+    сбрасывается сигналом при изменении Ingredient и перестраивается не реже
+    чем раз в INGREDIENT_INDEX_TTL секунд, чтобы другие воркеры тоже увидели
+    изменения.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.built_at = 0
+        self.lock = threading.Lock()
+
+    def is_fresh(self, index):
+        return index is not None and (
+            time.monotonic() - self.built_at < settings.INGREDIENT_INDEX_TTL
+        )
+
+    def peek(self):
+        """Построенный индекс, если он ещё не устарел, иначе None."""
+        index = self.index
+        return index if self.is_fresh(index) else None
+
+    def get(self):
+        index = self.index
+        if self.is_fresh(index):
+            return index
+        with self.lock:
+            if self.index is index:
+                self.index = IngredientIndex(
+                    Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'
+                    )
+                )
+                self.built_at = time.monotonic()
+            return self.index
+
+    def invalidate(self):
+        self.index = None
+
+
+ingredient_catalog = IngredientCatalog()
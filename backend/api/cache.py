@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from users.models import Follow
+
+
+class RecipeFragmentCache:
+    """
+    Кэш сериализованной части рецепта, которая не зависит от пользователя:
+    теги, ингредиенты, профиль автора, текст и картинка.
+
+    Ключ строится из id рецепта, его даты изменения и общей версии кэша.
+    Любое изменение рецепта, его тегов и строк ингредиентов сдвигает
+    updated_at, и старый фрагмент больше не читается, даже если его
+    сохранил читатель, отрисовавший рецепт до изменения. Изменение
+    справочников (тегов, ингредиентов, пользователей) поднимает версию
+    и тем самым сбрасывает все фрагменты сразу.
+    """
+
+    # Меняется вместе с составом полей фрагмента, чтобы не читать
+    # фрагменты старого формата из общего кэша после обновления.
+    fragment_format = 2
+    version_key = 'recipe:version'
+    hits_key = 'recipe:hits'
+    misses_key = 'recipe:misses'
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def get_version(self):
+        version = self.backend.get(self.version_key)
+        if version is None:
+            self.backend.add(self.version_key, 1, timeout=None)
+            version = self.backend.get(self.version_key, 1)
+        return version
+
+    def make_key(self, recipe, version):
+        return (
+            f'recipe:{recipe.id}:{recipe.updated_at.timestamp()}'
+            f':v{version}.{self.fragment_format}'
+        )
+
+    def get_many(self, recipes):
+        """Возвращает словарь {id рецепта: фрагмент} для найденных в кэше."""
+        recipes = list(recipes)
+        if not recipes:
+            return {}
+        version = self.get_version()
+        keys = {
+            self.make_key(recipe, version): recipe.id for recipe in recipes
+        }
+        fragments = {
+            keys[key]: fragment
+            for key, fragment in self.backend.get_many(keys).items()
+        }
+        self._count(self.hits_key, len(fragments))
+        self._count(self.misses_key, len(recipes) - len(fragments))
+        return fragments
+
+    def set_many(self, recipes, fragments):
+        """Сохраняет фрагменты {id рецепта: фрагмент} рецептов recipes."""
+        if not fragments:
+            return
+        version = self.get_version()
+        self.backend.set_many(
+            {
+                self.make_key(recipe, version): fragments[recipe.id]
+                for recipe in recipes
+                if recipe.id in fragments
+            },
+            timeout=settings.RECIPE_CACHE_TIMEOUT,
+        )
+
+    def invalidate_all(self):
+        try:
+            self.backend.incr(self.version_key)
+        except ValueError:
+            self.backend.add(self.version_key, 1, timeout=None)
+
+    def stats(self):
+        """Счётчики попаданий и промахов кэша."""
+        counters = self.backend.get_many((self.hits_key, self.misses_key))
+        return {
+            'hits': counters.get(self.hits_key, 0),
+            'misses': counters.get(self.misses_key, 0),
+        }
+
+    def _count(self, key, delta):
+        if not delta:
+            return
+        try:
+            self.backend.incr(key, delta)
+        except ValueError:
+            if not self.backend.add(key, delta, timeout=None):
+                self.backend.incr(key, delta)
+
+
+class FollowedAuthorsCache:
+    """
+    Множество id авторов, на которых подписан пользователь. Ключ включает
+    interactions_version пользователя, которую поднимает любое изменение
+    его подписок, поэтому устаревшее множество больше не читается.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def make_key(self, user):
+        return f'followed:{user.pk}:v{user.interactions_version}'
+
+    def get(self, user):
+        key = self.make_key(user)
+        authors = self.backend.get(key)
+        if authors is None:
+            authors = frozenset(
+                Follow.objects.filter(user=user).values_list(
+                    'author_id', flat=True
+                )
+            )
+            self.backend.set(
+                key, authors, timeout=settings.FOLLOWED_AUTHORS_TIMEOUT
+            )
+        return authors
+
+
+recipe_cache = RecipeFragmentCache(settings.RECIPE_CACHE_ALIAS)
+followed_authors = FollowedAuthorsCache(settings.RECIPE_CACHE_ALIAS)
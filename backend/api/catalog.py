@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.renderers import JSONRenderer
+
+from recipes.models import CatalogVersion, Ingredient, Tag
+from .serializers import IngredientSerializer, TagSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+class CatalogBlob:
+    """
+    Готовый ответ справочника: JSON и его сжатые варианты, слабый ETag
+    по содержимому и время последнего изменения справочника
+    для Last-Modified.
+    """
+
+    def __init__(self, content, last_modified):
+        self.variants = {
+            'identity': content,
+            'gzip': gzip.compress(content, compresslevel=9),
+        }
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(content)
+        self.etag = f'W/"{hashlib.sha1(content).hexdigest()}"'
+        self.last_modified = last_modified
+        self.built_at = time.monotonic()
+
+    def choose_encoding(self, request):
+        accepted = set()
+        for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+            coding, _, params = item.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0'):
+                accepted.add(coding.strip().lower())
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return 'identity'
+
+    def is_not_modified(self, request):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = {strip_weak(etag) for etag in parse_etags(if_none_match)}
+            return '*' in etags or strip_weak(self.etag) in etags
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return (
+            if_modified_since is not None
+            and self.last_modified <= if_modified_since
+        )
+
+    def response(self, request):
+        if self.is_not_modified(request):
+            response = HttpResponseNotModified()
+        else:
+            encoding = self.choose_encoding(request)
+            response = HttpResponse(
+                self.variants[encoding], content_type='application/json'
+            )
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class CatalogResponse:
+    """
+    Собранный ответ со списком справочника в памяти процесса. Сбрасывается
+    сигналом при изменении модели и пересобирается не реже чем раз
+    в CATALOG_RESPONSE_TTL секунд.
+    """
+
+    def __init__(self, model, serializer_class):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.blob = None
+        self.lock = threading.Lock()
+
+    def build(self):
+        # Версия читается раньше строк: изменение между запросами даст
+        # Last-Modified раньше содержимого, а не позже, и клиент не получит
+        # 304 на устаревший ответ.
+        changed_at = CatalogVersion.current(self.model).updated_at
+        data = self.serializer_class(self.model.objects.all(), many=True).data
+        return CatalogBlob(
+            JSONRenderer().render(data), int(changed_at.timestamp())
+        )
+
+    def is_fresh(self, blob):
+        return blob is not None and (
+            time.monotonic() - blob.built_at < settings.CATALOG_RESPONSE_TTL
+        )
+
+    def peek(self):
+        """Собранный ответ, если он ещё не устарел, иначе None."""
+        blob = self.blob
+        return blob if self.is_fresh(blob) else None
+
+    def get(self):
+        blob = self.blob
+        if self.is_fresh(blob):
+            return blob
+        with self.lock:
+            if self.blob is blob:
+                self.blob = self.build()
+            return self.blob
+
+    def invalidate(self):
+        self.blob = None
+
+
+tag_list_response = CatalogResponse(Tag, TagSerializer)
+ingredient_list_response = CatalogResponse(Ingredient, IngredientSerializer)
@@ -1,8 +1,12 @@
 import django_filters
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import FilterSet, filters
 from django_filters import rest_framework
 
 from recipes.models import Recipe, Tag, Ingredient
+from recipes.ranking import RANKINGS
+from recipes.search import get_search_backend
 
 
 class IngredientFilter(rest_framework.FilterSet):
@@ -15,10 +19,16 @@ class IngredientFilter(rest_framework.FilterSet):
 
 
 class RecipeFilter(FilterSet):
-    """Фильтр для рецептов: по избранному, списку покупок, автору и тегам."""
+    """
+    Фильтр для рецептов: по избранному, списку покупок, автору, тегам
+    и точному названию (name), полнотекстовый поиск с ранжированием (search).
+    Сортировка ?ordering=popular|trending берётся из заранее посчитанных
+    рейтингов.
+    """
     name = django_filters.CharFilter(
         field_name='name',
     )
+    search = django_filters.CharFilter(method='filter_search')
     author = django_filters.CharFilter(
         field_name='author',
     )
@@ -31,17 +41,30 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in RANKINGS],
+        method='filter_ordering',
+    )
+
+    def filter_search(self, queryset, name, value):
+        return get_search_backend().search_recipes(queryset, value)
 
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(favorites__user=self.request.user.id)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
-            return queryset.filter(shopping_list__user=self.request.user)
+            return queryset.filter(shopping_list__user=self.request.user.id)
         return queryset
 
+    def filter_ordering(self, queryset, name, value):
+        # LEFT JOIN: рецепт без строки рейтинга стоит с нулевым.
+        return queryset.annotate(
+            score=Coalesce(F(f'ranking__{RANKINGS[value]}'), Value(0.0))
+        ).order_by('-score', '-id')
+
     class Meta:
         model = Recipe
         fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
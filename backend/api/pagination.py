@@ -1,10 +1,206 @@
+import json
+
 from django.conf import settings
-from django.core import paginator
-from rest_framework.pagination import PageNumberPagination
+from django.core import exceptions, paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Курсорная пагинация по ключу сортировки: страница выбирается условием
+    WHERE по индексу, без COUNT(*) и OFFSET.
+
+    DRF хранит в курсоре значение только первого поля сортировки, а строки
+    с таким же значением пропускает смещением, которое сбивается, когда
+    строки добавляются или удаляются. При составной сортировке, например
+    ('-score', '-id'), где одинаковых оценок много, курсор хранит значения
+    всех полей, и страница начинается строго после последней строки
+    предыдущей: (score, id) < (s, i). Поля такой сортировки не должны
+    принимать NULL, а последнее должно быть уникальным.
+    """
+    page_size = settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request, queryset, view)
+        if len(ordering) == 1:
+            return super().paginate_queryset(queryset, request, view)
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = ordering
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            _, reverse, current_position = self.cursor
+        queryset = queryset.order_by(
+            *(_reverse_ordering(ordering) if reverse else ordering)
+        )
+        if current_position is not None:
+            queryset = self.filter_after(queryset, current_position, reverse)
+        # Позиции строк различаются, поэтому смещение всегда нулевое.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], ordering
+            )
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def filter_after(self, queryset, position, reverse):
+        """
+        Строки строго после позиции в порядке выдачи:
+        a > x OR (a = x AND (b > y OR (b = y AND ...))), где сравнение
+        каждого поля зависит от его направления и направления курсора.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        for order, value in reversed(list(zip(self.ordering, values))):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            after = Q(**{f'{field}__{lookup}': value})
+            if condition:
+                after |= Q(**{field: value}) & condition
+            condition = after
+        try:
+            return queryset.filter(condition)
+        except (TypeError, ValueError, exceptions.ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+        return json.dumps(
+            [
+                instance[name.lstrip('-')] if isinstance(instance, dict)
+                else getattr(instance, name.lstrip('-'))
+                for name in ordering
+            ],
+            cls=DjangoJSONEncoder,
+        )
+
+
+class FeedPagination(CursorPagination):
+    """
+    Пагинация ленты подписок только вперёд: курсор хранит id последнего
+    рецепта страницы, следующая страница начинается с меньших id.
+    """
+    page_size = settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+    def paginate_ids(self, fetch, request):
+        """
+        Id рецептов страницы. fetch(before, count) возвращает не больше
+        count id ленты по убыванию, меньших before.
+        """
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        before = None
+        if self.cursor is not None:
+            try:
+                before = int(self.cursor.position)
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        ids = fetch(before, self.page_size + 1)
+        self.has_next = len(ids) > self.page_size
+        self.has_previous = False
+        self.page = ids[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.page[-1])
+        )
+
+    def get_previous_link(self):
+        return None
 
 
 class UserPagination(PageNumberPagination):
-    """Класс для отображения пагинации."""
+    """
+    Класс для отображения пагинации.
+
+    По умолчанию используется постраничная пагинация. С параметром
+    ?pagination=cursor (или при передаче ?cursor=) включается курсорная:
+    ответ содержит непрозрачные ссылки next/previous вместо count.
+    """
     django_paginator_class = paginator.Paginator
     page_size_query_param = 'limit'
     page_size = settings.PAGE_SIZE
+    mode_query_param = 'pagination'
+    cursor_pagination_class = KeysetPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_state(self):
+        """
+        То, от чего ответ зависит помимо строк страницы: общее количество
+        или, для курсорной пагинации, ссылки на соседние страницы.
+        """
+        if self.cursor_paginator is not None:
+            return (
+                self.cursor_paginator.get_next_link(),
+                self.cursor_paginator.get_previous_link(),
+            )
+        return self.page.paginator.count
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,188 @@
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from recipes.models import CatalogVersion, IngredientRecipe, Recipe
+from recipes.similarity import fetch_pairs
+
+
+class PantryIndex:
+    """
+    Инвертированный индекс ингредиент → рецепты. Для каждого ингредиента
+    хранится отсортированный участок общего массива postings с номерами
+    рецептов (int32), рядом — число ингредиентов каждого рецепта.
+
+    Рецепты, изменённые после сборки, лежат в overlay: их строки в основных
+    массивах маскируются, а покрытие считается по актуальному набору
+    ингредиентов.
+    """
+
+    def __init__(self, pairs, synced_at, version):
+        self.recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        self.sizes = np.bincount(rows, minlength=len(self.recipe_ids))
+        order = np.lexsort((rows, pairs[:, 1]))
+        self.ingredient_ids, starts = np.unique(
+            pairs[order, 1], return_index=True
+        )
+        self.offsets = np.append(starts, len(order))
+        self.postings = rows[order].astype(np.int32)
+        self.masked = np.zeros(len(self.recipe_ids), dtype=bool)
+        self.overlay = {}
+        self.synced_at = synced_at
+        self.version = version
+
+    def with_changes(self, changes, synced_at, version):
+        """Копия индекса с новым составом ингредиентов у части рецептов."""
+        index = object.__new__(PantryIndex)
+        index.__dict__.update(self.__dict__)
+        index.overlay = {**self.overlay, **changes}
+        index.masked = self.masked.copy()
+        rows = np.searchsorted(self.recipe_ids, list(changes))
+        rows = rows[rows < len(self.recipe_ids)]
+        rows = rows[np.isin(self.recipe_ids[rows], list(changes))]
+        index.masked[rows] = True
+        index.synced_at = synced_at
+        index.version = version
+        return index
+
+    def rank(self, ingredient_ids, count):
+        """
+        Рецепты, где есть хотя бы один из ингредиентов: сначала с меньшим
+        числом недостающих, затем с большей долей покрытия. Возвращает
+        для не больше чем count рецептов массивы id, числа найденных и всех
+        ингредиентов, а также общее число подходящих рецептов.
+        """
+        wanted = np.unique(np.asarray(ingredient_ids, dtype=np.int64))
+        positions = np.searchsorted(self.ingredient_ids, wanted)
+        positions = positions[positions < len(self.ingredient_ids)]
+        positions = positions[
+            np.isin(self.ingredient_ids[positions], wanted)
+        ]
+        counts = np.zeros(len(self.recipe_ids), dtype=np.int64)
+        if len(positions):
+            counts = np.bincount(
+                np.concatenate([
+                    self.postings[self.offsets[p]:self.offsets[p + 1]]
+                    for p in positions
+                ]),
+                minlength=len(self.recipe_ids),
+            )
+        counts[self.masked] = 0
+        rows = np.flatnonzero(counts)
+        ids = self.recipe_ids[rows]
+        matched = counts[rows]
+        sizes = self.sizes[rows]
+
+        have = set(wanted.tolist())
+        extra = [
+            (recipe_id, len(ingredients & have), len(ingredients))
+            for recipe_id, ingredients in self.overlay.items()
+            if ingredients & have
+        ]
+        if extra:
+            extra = np.asarray(extra, dtype=np.int64)
+            ids = np.concatenate((ids, extra[:, 0]))
+            matched = np.concatenate((matched, extra[:, 1]))
+            sizes = np.concatenate((sizes, extra[:, 2]))
+
+        # Недостающие ингредиенты важнее доли покрытия: ключ 2 * missing
+        # - coverage сохраняет этот порядок и помещается в одно число.
+        key = 2 * (sizes - matched) - matched / sizes
+        if count < len(key):
+            # Рецепты с тем же ключом, что у последнего из count, берутся
+            # все, чтобы среди равных остались самые новые.
+            threshold = np.partition(key, count - 1)[count - 1]
+            top = np.flatnonzero(key <= threshold)
+        else:
+            top = np.arange(len(key))
+        top = top[np.lexsort((-ids[top], key[top]))][:count]
+        return ids[top], matched[top], sizes[top], len(key)
+
+
+class PantryCatalog:
+    """
+    Индекс «что приготовить» текущего процесса. Строится при первом
+    обращении и заново не реже чем раз в PANTRY_INDEX_TTL секунд. Между
+    сборками сигналы поднимают версию состава рецептов в базе
+    (CatalogVersion), и каждый процесс, увидев новую версию, догружает
+    рецепты, изменённые после последней синхронизации. Версия в базе,
+    а не в кэше процесса, поэтому воркеры не расходятся.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.built_at = 0
+        self.lock = threading.Lock()
+
+    def get_version(self):
+        return CatalogVersion.current(IngredientRecipe).version
+
+    def touch(self):
+        CatalogVersion.touch(IngredientRecipe)
+
+    def clear(self):
+        with self.lock:
+            self.index = None
+
+    def build(self, version):
+        synced_at = timezone.now()
+        return PantryIndex(
+            fetch_pairs(
+                IngredientRecipe.objects.values_list(
+                    'recipe_id', 'ingredient_id'
+                )
+            ),
+            synced_at,
+            version,
+        )
+
+    def sync(self, index, version):
+        """Переносит в overlay рецепты, изменённые после синхронизации."""
+        synced_at = timezone.now()
+        changed = Recipe.objects.filter(
+            updated_at__gte=index.synced_at - timedelta(
+                seconds=settings.PANTRY_SYNC_MARGIN
+            )
+        ).values('id')
+        changes = {
+            recipe_id: set()
+            for recipe_id in changed.values_list('id', flat=True)
+        }
+        for recipe_id, ingredient_id in IngredientRecipe.objects.filter(
+            recipe_id__in=changed
+        ).values_list('recipe_id', 'ingredient_id'):
+            changes[recipe_id].add(ingredient_id)
+        return index.with_changes(
+            {
+                recipe_id: frozenset(ingredients)
+                for recipe_id, ingredients in changes.items()
+            },
+            synced_at,
+            version,
+        )
+
+    def get(self):
+        index = self.index
+        version = self.get_version()
+        if index is not None and index.version == version and (
+            time.monotonic() - self.built_at < settings.PANTRY_INDEX_TTL
+        ):
+            return index
+        with self.lock:
+            if self.index is index:
+                if index is None or (
+                    time.monotonic() - self.built_at
+                    >= settings.PANTRY_INDEX_TTL
+                ):
+                    self.index = self.build(version)
+                    self.built_at = time.monotonic()
+                else:
+                    self.index = self.sync(index, version)
+            return self.index
+
+
+pantry_catalog = PantryCatalog()
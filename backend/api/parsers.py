@@ -0,0 +1,31 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+class RecipeMultiPartParser(MultiPartParser):
+    """
+    Рецепт в multipart/form-data: картинка приходит файлом и сохраняется
+    во временный файл, не попадая в память целиком. Списки tags
+    и ingredients передаются JSON-массивом в одном поле или повторением
+    поля с JSON-значением элемента.
+    """
+
+    json_fields = ('tags', 'ingredients')
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        data = {}
+        for key, values in parsed.data.lists():
+            if key not in self.json_fields:
+                data[key] = values[-1]
+                continue
+            try:
+                items = [json.loads(value) for value in values]
+            except ValueError:
+                raise ParseError(f'Поле {key} должно содержать JSON.')
+            if len(items) == 1 and isinstance(items[0], list):
+                items = items[0]
+            data[key] = items
+        return DataAndFiles(data, parsed.files.dict())
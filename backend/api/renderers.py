@@ -0,0 +1,174 @@
+import csv
+import io
+import json
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import date
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+# Буквы, которые обязан содержать шрифт PDF: встроенные шрифты PDF
+# кириллицу не отображают.
+CYRILLIC_SAMPLE = 'АБВЁЖЯабвёжя'
+
+
+@lru_cache(maxsize=None)
+def register_font(path):
+    """
+    Регистрирует шрифт SHOPPING_LIST_FONT один раз на процесс и возвращает
+    его имя. Без файла или без кириллицы выгрузка PDF не работает.
+    """
+    try:
+        font = TTFont(f'ShoppingList:{path}', path)
+    except (OSError, TTFError) as error:
+        raise ImproperlyConfigured(
+            f'SHOPPING_LIST_FONT: не удалось загрузить шрифт {path}: {error}'
+        )
+    if not all(ord(char) in font.face.charToGlyph for char in CYRILLIC_SAMPLE):
+        raise ImproperlyConfigured(
+            f'SHOPPING_LIST_FONT: в шрифте {path} нет кириллицы.'
+        )
+    pdfmetrics.registerFont(font)
+    return font.fontName
+
+
+class ShoppingListRenderer(ABC, BaseRenderer):
+    """
+    Базовый класс форматов выгрузки списка покупок. Формат выбирается
+    параметром ?format= или заголовком Accept, тело ответа отдаёт stream().
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Ответы с ошибками отдаются в виде JSON-текста."""
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    @abstractmethod
+    def stream(self, user, ingredients):
+        """Итератор байтов документа по строкам ингредиентов."""
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, user, ingredients):
+        today = date.today()
+        yield (
+            f'Список покупок пользователя: {user.username}\n\n'
+            f'Дата: {today:%Y-%m-%d}\n\n'
+        ).encode()
+        separator = ''
+        for ingredient in ingredients:
+            yield (
+                f'{separator}- {ingredient["ingredient__name"]} '
+                f'({ingredient["ingredient__measurement_unit"]}) - '
+                f'{ingredient["amount"]}'
+            ).encode()
+            separator = '\n'
+        yield f'\n\nFoodgram ({today:%Y})'.encode()
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, user, ingredients):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM нужен, чтобы Excel распознал кодировку UTF-8.
+        buffer.write('\ufeff')
+        writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+        for ingredient in ingredients:
+            writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient__measurement_unit'],
+                ingredient['amount'],
+            ))
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    """
+    reportlab держит страницы в памяти и пишет таблицу ссылок в конце,
+    поэтому PDF собирается целиком до ответа. Готовый файл пишется
+    во временный файл, который уходит на диск, если документ больше
+    spool_size, и отдаётся частями по chunk_size.
+    """
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    chunk_size = 1 << 16
+    spool_size = 1 << 20
+    font_size = 12
+    margin = 50
+    line_height = 18
+
+    def stream(self, user, ingredients):
+        # Шрифт проверяется до начала ответа, чтобы ошибка настройки
+        # не обрывала уже отправленный файл.
+        font = register_font(settings.SHOPPING_LIST_FONT)
+        output = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            self.draw(output, font, self.lines(user, ingredients))
+            output.seek(0)
+        except BaseException:
+            output.close()
+            raise
+        return self.read(output)
+
+    def read(self, output):
+        with output:
+            yield from iter(lambda: output.read(self.chunk_size), b'')
+
+    def lines(self, user, ingredients):
+        today = date.today()
+        yield f'Список покупок пользователя: {user.username}'
+        yield f'Дата: {today:%Y-%m-%d}'
+        yield ''
+        for ingredient in ingredients:
+            yield (
+                f'- {ingredient["ingredient__name"]} '
+                f'({ingredient["ingredient__measurement_unit"]}) - '
+                f'{ingredient["amount"]}'
+            )
+        yield ''
+        yield f'Foodgram ({today:%Y})'
+
+    def draw(self, output, font, lines):
+        pdf = canvas.Canvas(output, pagesize=A4)
+        _, height = A4
+
+        def new_page():
+            pdf.setFont(font, self.font_size)
+            return height - self.margin
+
+        y = new_page()
+        for line in lines:
+            if y < self.margin:
+                pdf.showPage()
+                y = new_page()
+            pdf.drawString(self.margin, y, line)
+            y -= self.line_height
+        pdf.save()
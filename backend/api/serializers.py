@@ -1,26 +1,69 @@
 import base64
+import uuid
+from collections import defaultdict
 
+from django.conf import settings
 from django.core.files.base import ContentFile
-from django.db import IntegrityError
+from django.db import IntegrityError, models
+from django.db.models import Prefetch, prefetch_related_objects
 from django.db.transaction import atomic
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from rest_framework import exceptions, relations, serializers, status
+from PIL import Image
+from rest_framework import exceptions, serializers, status
 from rest_framework.exceptions import ValidationError
 
+from recipes.carts import change_recipe_ingredients
+from recipes.images import rendition_urls, validate_recipe_image
 from recipes.models import (
+    CartIngredient,
     Favorite,
+    ImageUpload,
     Ingredient,
     IngredientRecipe,
     Recipe,
     ShoppingList,
     Tag,
 )
+from recipes.querysets import limit_per_group
 from users.models import Follow, User
+from .cache import followed_authors, recipe_cache
+from .utils import pk_range
 
 
 class Base64ImageField(serializers.ImageField):
+    """
+    Картинка файлом из multipart-запроса, строкой base64 или ссылкой
+    upload:<токен> на завершённую загрузку частями.
+    """
+
+    upload_prefix = 'upload:'
+
+    def get_upload(self, token):
+        try:
+            token = uuid.UUID(token)
+        except ValueError:
+            raise ValidationError('Неверный токен загрузки.')
+        upload = ImageUpload.objects.filter(
+            user=self.context['request'].user, pk=token
+        ).first()
+        if upload is None or not upload.is_complete:
+            raise ValidationError('Загрузка картинки не найдена.')
+        file = upload.open()
+        # Расширение имени проверяет валидатор модели, а у загрузки
+        # частями имени нет, поэтому формат берётся из самого файла.
+        try:
+            with Image.open(file) as image:
+                file.name = f'{file.name}.{image.format.lower()}'
+        except (OSError, Image.DecompressionBombError):
+            file.close()
+            raise ValidationError('Загрузите корректную картинку.')
+        file.seek(0)
+        return file
+
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
+        if isinstance(data, str) and data.startswith(self.upload_prefix):
+            data = self.get_upload(data[len(self.upload_prefix):])
+        elif isinstance(data, str) and data.startswith('data:image'):
             format, image_string = data.split(';base64,')
             file_extension = format.split('/')[-1]
             data = ContentFile(
@@ -30,6 +73,18 @@ class Base64ImageField(serializers.ImageField):
         return super().to_internal_value(data)
 
 
+def get_followed_authors(request):
+    """
+    id авторов, на которых подписан текущий пользователь. Читаются один раз
+    за запрос и общие для всех сериализаторов с этим запросом в контексте.
+    """
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+    if not hasattr(request, 'followed_authors'):
+        request.followed_authors = followed_authors.get(request.user)
+    return request.followed_authors
+
+
 class UserGetSerializer(UserSerializer):
     """Сериализатор для просмотра профиля пользователя."""
     is_subscribed = serializers.SerializerMethodField()
@@ -46,13 +101,34 @@ class UserGetSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request.user.is_anonymous:
-            return False
+        return obj.pk in get_followed_authors(self.context.get('request'))
 
-        return Follow.objects.filter(
-            author=obj, user=request.user
-        ).exists()
+
+class UserProfileSerializer(serializers.ModelSerializer):
+    """
+    Профиль автора без признака подписки: одинаков для всех пользователей.
+    """
+
+    class Meta:
+        model = User
+        fields = tuple(
+            field for field in UserGetSerializer.Meta.fields
+            if field != 'is_subscribed'
+        )
+
+
+class UserRecipesListSerializer(serializers.ListSerializer):
+    """
+    Список подписок: рецепты всех авторов страницы читаются одним
+    запросом, не больше recipes_limit на автора.
+    """
+
+    def to_representation(self, data):
+        authors = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        self.child.load_recipes(authors)
+        return super().to_representation(authors)
 
 
 class UserRecipesSerializer(UserGetSerializer):
@@ -67,6 +143,7 @@ class UserRecipesSerializer(UserGetSerializer):
             'recipes',
             'recipes_count'
         )
+        list_serializer_class = UserRecipesListSerializer
 
     def validate(self, data):
         author = self.instance
@@ -84,17 +161,45 @@ class UserRecipesSerializer(UserGetSerializer):
         return data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
-    def get_recipes(self, object):
+    def get_recipes_limit(self):
         request = self.context.get('request')
-        context = {'request': request}
-        recipes_limit = request.query_params.get('recipes_limit')
-        queryset = object.recipes.all()
-        if recipes_limit:
-            queryset = queryset[:int(recipes_limit)]
+        try:
+            limit = int(request.query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            return None
+        # Отрицательный срез queryset не поддерживает, такой лимит
+        # игнорируется, как и нечисловой.
+        return limit if limit >= 0 else None
+
+    def load_recipes(self, authors):
+        """Раскладывает рецепты авторов по атрибуту short_recipes."""
+        limit = self.get_recipes_limit()
+        if not authors or limit == 0:
+            for author in authors:
+                author.short_recipes = []
+            return
+        recipes = Recipe.objects.filter(author__in=authors).only(
+            'id', 'name', 'image', 'image_renditions', 'cooking_time',
+            'author',
+        )
+        if limit is not None:
+            recipes = limit_per_group(recipes, 'author', limit)
+        by_author = defaultdict(list)
+        for recipe in recipes:
+            by_author[recipe.author_id].append(recipe)
+        for author in authors:
+            author.short_recipes = by_author[author.id]
 
-        return RecipeShortSerializer(queryset, context=context, many=True).data
+    def get_recipes(self, object):
+        if not hasattr(object, 'short_recipes'):
+            self.load_recipes([object])
+        return RecipeShortSerializer(
+            object.short_recipes,
+            context={'request': self.context.get('request')},
+            many=True,
+        ).data
 
 
 class UserPostSerializer(UserCreateSerializer):
@@ -113,6 +218,7 @@ class UserPostSerializer(UserCreateSerializer):
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения краткой информации о рецептах."""
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -120,9 +226,17 @@ class RecipeShortSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
 
+    def get_images(self, obj):
+        request = self.context.get('request')
+        return rendition_urls(
+            obj.image_renditions,
+            request.build_absolute_uri if request else None,
+        )
+
 
 class FollowSerializer(UserGetSerializer):
     """Сериализатор для подписок."""
@@ -160,11 +274,12 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class IngredientRecipeSerializer(serializers.ModelSerializer):
-    """Сериализатор для отображения ингредиентов в рецептах."""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient.id'
-    )
+    """
+    Сериализатор для отображения ингредиентов в рецептах. Существование
+    ингредиентов при записи проверяет RecipeCreateSerializer одним запросом
+    на весь рецепт.
+    """
+    id = serializers.IntegerField(source='ingredient.id')
     name = serializers.CharField(
         source='ingredient.name',
         read_only=True
@@ -179,6 +294,19 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount',)
 
 
+class CartIngredientSerializer(serializers.ModelSerializer):
+    """Сериализатор итогов списка покупок."""
+    id = serializers.IntegerField(source='ingredient.id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = CartIngredient
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class FavoriteAndShoppingCreateSerializer(serializers.ModelSerializer):
     """
     Сериализатор для добавления рецептов в список избранного и корзину.
@@ -235,6 +363,48 @@ class ShoppingListSerializer(FavoriteAndShoppingCreateSerializer):
         )
 
 
+class BulkIdsSerializer(serializers.Serializer):
+    """
+    Список id для массового добавления и удаления. Модель, к которой
+    относятся id, передаётся в контексте как target.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RELATIONS_LIMIT,
+    )
+
+    def validate_ids(self, value):
+        bounds = pk_range(self.context['target'])
+        if bounds is not None and max(value) > bounds[1]:
+            raise ValidationError(
+                f'Id должны быть не больше {bounds[1]}.'
+            )
+        return list(dict.fromkeys(value))
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Сериализатор загрузки картинки частями."""
+
+    class Meta:
+        model = ImageUpload
+        fields = ('token', 'size', 'offset')
+        read_only_fields = ('token', 'offset')
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.RECIPE_IMAGE_MAX_SIZE:
+            raise ValidationError(
+                'Размер картинки должен быть от 1 байта до '
+                f'{settings.RECIPE_IMAGE_MAX_SIZE} байт.'
+            )
+        return value
+
+    def create(self, validated_data):
+        return ImageUpload.objects.create(
+            user=self.context['request'].user, **validated_data
+        )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Tag."""
     class Meta:
@@ -242,13 +412,74 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
+class RecipeFragmentSerializer(serializers.ModelSerializer):
+    """
+    Часть рецепта, которая не зависит от пользователя. Результат хранится
+    в кэше фрагментов.
+    """
+
+    image = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+    tags = TagSerializer(many=True, read_only=True)
+    author = UserProfileSerializer(read_only=True)
+    ingredients = IngredientRecipeSerializer(
+        many=True, read_only=True, source='ingredient_list'
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id',
+            'tags',
+            'author',
+            'ingredients',
+            'name',
+            'image',
+            'images',
+            'text',
+            'cooking_time',
+        )
+
+    def get_image(self, obj):
+        return obj.image.url if obj.image else None
+
+    def get_images(self, obj):
+        return rendition_urls(obj.image_renditions)
+
+
+class RecipeReadListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор списка рецептов: фрагменты всей страницы читаются из кэша
+    одним обращением, из базы догружаются только отсутствующие.
+    """
+
+    def to_representation(self, data):
+        recipes = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        fragments = self.child.get_fragments(recipes)
+        return [
+            self.child.personalize(fragments[recipe.id], recipe)
+            for recipe in recipes
+        ]
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     """
     Определение логики сериализации для чтения (отображения) объектов модели
     рецептов.
     """
 
+    prefetch = (
+        'tags',
+        Prefetch(
+            'ingredient_list',
+            queryset=IngredientRecipe.objects.select_related('ingredient')
+        ),
+    )
+
     image = Base64ImageField()
+    images = serializers.JSONField(source='image_renditions', read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     author = UserGetSerializer(read_only=True)
     is_favorited = serializers.BooleanField(default=False, read_only=True)
@@ -261,6 +492,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
+        list_serializer_class = RecipeReadListSerializer
         fields = (
             'id',
             'tags',
@@ -270,20 +502,65 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time',
         )
 
+    def get_fragments(self, recipes):
+        """Возвращает {id рецепта: фрагмент}, заполняя промахи кэша."""
+        fragments = recipe_cache.get_many(recipes)
+        missing = [recipe for recipe in recipes if recipe.id not in fragments]
+        if missing:
+            prefetch_related_objects(missing, *self.prefetch)
+            built = {
+                recipe.id: RecipeFragmentSerializer(recipe).data
+                for recipe in missing
+            }
+            recipe_cache.set_many(missing, built)
+            fragments.update(built)
+        return fragments
+
+    def personalize(self, fragment, instance):
+        """Дополняет фрагмент признаками, зависящими от пользователя."""
+        is_subscribed = instance.author_id in get_followed_authors(
+            self.context.get('request')
+        )
+        data = dict(
+            fragment,
+            author=dict(fragment['author'], is_subscribed=is_subscribed),
+            is_favorited=getattr(instance, 'is_favorited', False),
+            is_in_shopping_cart=getattr(
+                instance, 'is_in_shopping_cart', False
+            ),
+        )
+        request = self.context.get('request')
+        if request is not None:
+            if data['image']:
+                data['image'] = request.build_absolute_uri(data['image'])
+            data['images'] = {
+                name: {
+                    extension: request.build_absolute_uri(url)
+                    for extension, url in files.items()
+                }
+                for name, files in data['images'].items()
+            }
+        return {field: data[field] for field in self.Meta.fields}
+
+    def to_representation(self, instance):
+        fragment = self.get_fragments([instance])[instance.id]
+        return self.personalize(fragment, instance)
+
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализотор для создания рецептов."""
 
-    tags = relations.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     author = UserSerializer(read_only=True)
     ingredients = IngredientRecipeSerializer(many=True)
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = Base64ImageField(
+        max_length=None, use_url=True, validators=[validate_recipe_image]
+    )
 
     class Meta:
         model = Recipe
@@ -308,7 +585,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ingredients_list.append(
                 IngredientRecipe(
                     recipe=recipe,
-                    ingredient=current_ingredient,
+                    ingredient_id=current_ingredient,
                     amount=current_amount
                 )
             )
@@ -324,6 +601,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             recipe.save()
             recipe.tags.set(tags)
             self.create_bulk_ingredients(ingredients_list, recipe)
+            self.release_upload(validated_data.get('image'))
             return recipe
         except IntegrityError:
             error_message = (
@@ -331,15 +609,63 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
             raise serializers.ValidationError({'error': error_message})
 
+    def update_ingredients(self, recipe, ingredients):
+        """
+        Приводит ингредиенты рецепта к переданным: добавляет новые строки,
+        меняет количество у изменившихся и удаляет лишние.
+        """
+        current = {
+            item.ingredient_id: item for item in recipe.ingredient_list.all()
+        }
+        amounts = {
+            ingredient['ingredient']['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            recipe.ingredient_list.filter(ingredient_id__in=removed).delete()
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amounts[ingredient_id],
+            )
+            for ingredient_id in amounts.keys() - current.keys()
+        )
+        # Удалённые строки вычитаются из корзин сигналом post_delete,
+        # bulk_create и bulk_update сигналов не отправляют.
+        deltas = {
+            ingredient_id: amounts[ingredient_id]
+            for ingredient_id in amounts.keys() - current.keys()
+        }
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id, item.amount)
+            if item.amount != amount:
+                deltas[ingredient_id] = amount - item.amount
+                item.amount = amount
+                changed.append(item)
+        IngredientRecipe.objects.bulk_update(changed, ('amount',))
+        change_recipe_ingredients(recipe.id, deltas)
+
     @atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_bulk_ingredients(recipe=instance, ingredients=ingredients)
-        return super().update(instance, validated_data)
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        recipe = super().update(instance, validated_data)
+        self.release_upload(validated_data.get('image'))
+        return recipe
+
+    def release_upload(self, image):
+        """Удаляет загрузку частями, картинка из которой ушла в рецепт."""
+        upload = getattr(image, 'upload', None)
+        if upload is not None:
+            image.close()
+            upload.delete()
 
     def to_representation(self, instance):
         serializer = RecipeReadSerializer(
@@ -349,26 +675,35 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def validate_ingredients(self, data):
-        ingredients = self.initial_data.get('ingredients')
-        if not ingredients:
+        if not data:
             raise exceptions.ValidationError(
                 {'ingredients': 'Невозможно добавить рецепт без ингредиентов!'}
             )
-        ingredients_list = []
-        for item in ingredients:
-            if item['id'] in ingredients_list:
-                raise exceptions.ValidationError(
-                    {'ingredients': 'Ингредиенты не могут повторяться!'}
-                )
-            ingredients_list.append(item['id'])
-            if int(item['amount']) < 1:
-                raise exceptions.ValidationError(
-                    {
-                        'amount': (
-                            'Количество ингредиентов не может быть меньше 1'
-                        )
-                    }
-                )
+        ingredient_ids = {item['ingredient']['id'] for item in data}
+        if len(ingredient_ids) != len(data):
+            raise exceptions.ValidationError(
+                {'ingredients': 'Ингредиенты не могут повторяться!'}
+            )
+        if any(item['amount'] < 1 for item in data):
+            raise exceptions.ValidationError(
+                {
+                    'amount': (
+                        'Количество ингредиентов не может быть меньше 1'
+                    )
+                }
+            )
+        missing = ingredient_ids - set(
+            Ingredient.objects.filter(id__in=ingredient_ids).values_list(
+                'id', flat=True
+            )
+        )
+        if missing:
+            raise exceptions.ValidationError(
+                {'ingredients': (
+                    'Ингредиенты не найдены: '
+                    f'{", ".join(map(str, sorted(missing)))}'
+                )}
+            )
         return data
 
     def validate_cooking_time(self, data):
@@ -382,16 +717,21 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return data
 
     def validate_tags(self, data):
-        tags = self.initial_data.get('tags', False)
-        if not tags:
+        if not data:
             raise exceptions.ValidationError(
                 {'tags': 'Рецепт не может быть создан без тегов!'}
             )
-        tags_list = []
-        for tags in tags:
-            if tags in tags_list:
-                raise exceptions.ValidationError(
-                    {'tags': 'Нельзя использовать повторяющиеся теги!'}
-                )
-            tags_list.append(tags)
-        return data
+        if len(set(data)) != len(data):
+            raise exceptions.ValidationError(
+                {'tags': 'Нельзя использовать повторяющиеся теги!'}
+            )
+        tags = Tag.objects.in_bulk(data)
+        missing = [tag_id for tag_id in data if tag_id not in tags]
+        if missing:
+            raise exceptions.ValidationError(
+                {'tags': (
+                    'Теги не найдены: '
+                    f'{", ".join(map(str, sorted(missing)))}'
+                )}
+            )
+        return [tags[tag_id] for tag_id in data]
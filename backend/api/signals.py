@@ -0,0 +1,111 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_users
+from api.autocomplete import ingredient_catalog
+from api.cache import recipe_cache
+from api.catalog import ingredient_list_response, tag_list_response
+from api.pantry import pantry_catalog
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingList,
+    Tag,
+)
+from recipes.relations import relations_added, relations_removed
+from users.models import Follow, User
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=IngredientRecipe)
+def recipe_relations_cleared(sender, action, reverse, pk_set, **kwargs):
+    """
+    Изменения рецепта, его тегов и ингредиентов сдвигают updated_at
+    из ключа фрагмента. Только очистка связей со стороны тега или
+    ингредиента не сообщает, какие рецепты затронуты.
+    """
+    if action == 'post_clear' and reverse:
+        transaction.on_commit(recipe_cache.invalidate_all)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+@receiver(m2m_changed, sender=IngredientRecipe)
+def recipe_ingredients_changed(sender, action='post_', **kwargs):
+    """Процессы догрузят изменённые рецепты в индекс «что приготовить»."""
+    if action.startswith('post_'):
+        transaction.on_commit(pantry_catalog.touch)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    transaction.on_commit(recipe_cache.invalidate_all)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    transaction.on_commit(tag_list_response.invalidate)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    transaction.on_commit(ingredient_catalog.invalidate)
+    transaction.on_commit(ingredient_list_response.invalidate)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, created, update_fields=None, **kwargs):
+    if created or (
+        update_fields and set(update_fields) <= {'last_login', 'password'}
+    ):
+        return
+    transaction.on_commit(recipe_cache.invalidate_all)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(token_users.delete, instance.key))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Смена пароля, деактивация и правка профиля сбрасывают токен."""
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    transaction.on_commit(partial(token_users.forget_users, [instance.pk]))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def user_interactions_changed(sender, instance, created=True, **kwargs):
+    """
+    Кэш токенов хранит interactions_version, от которой зависят ETag
+    и ключ кэша подписок, поэтому её изменение сбрасывает запись.
+    """
+    if created:
+        transaction.on_commit(
+            partial(token_users.forget_users, [instance.user_id])
+        )
+
+
+@receiver(relations_added)
+@receiver(relations_removed)
+def user_relations_changed(sender, user_id, **kwargs):
+    transaction.on_commit(partial(token_users.forget_users, [user_id]))
@@ -19,6 +19,11 @@ router.register(
     'ingredients',
     views.IngredientViewSet,
 )
+router.register(
+    'uploads',
+    views.ImageUploadViewSet,
+    basename='uploads',
+)
 router.register(
     'users',
     views.UserViewSet,
@@ -1,37 +1,119 @@
-from datetime import date
+import hashlib
 
-from rest_framework.generics import get_object_or_404
+from django.core.exceptions import ValidationError
+from django.db.backends.base.operations import BaseDatabaseOperations
+from django.db.transaction import atomic
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 
-from recipes.models import Recipe
+from recipes.relations import (
+    add_relation,
+    add_relations,
+    remove_relation,
+    remove_relations,
+)
 
 
-def serializer_add_method(serializer_name, request, recipe_id):
-    user = request.user
-    data = {'user': user.id, 'recipe': recipe_id}
-    serializer = serializer_name(data=data, context={'request': request})
-    serializer.is_valid(raise_exception=True)
-    serializer.save()
+def make_etag(*parts):
+    """Слабый ETag из значений, от которых зависит ответ."""
+    digest = hashlib.sha1(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'W/"{digest}"'
 
 
-def serializer_delete_method(model, request, recipe_id):
-    user = request.user
-    get_object_or_404(
-        model, user=user, recipe=get_object_or_404(Recipe, id=recipe_id)
-    ).delete()
+def pk_range(model):
+    """
+    Диапазон значений столбца ключа модели или None для нечислового
+    ключа. Числа вне него SQLite не может передать в запрос и падает
+    с OverflowError. Границы берутся общие для всех баз, потому что
+    SQLite своих не сообщает.
+    """
+    return BaseDatabaseOperations.integer_field_ranges.get(
+        model._meta.pk.get_internal_type()
+    )
 
 
-def export_ingredients(self, request, ingredients):
-    user = self.request.user
-    today = date.today()
-    shopping_list = f'Список покупок пользователя: {user.username}\n\n'
-    shopping_list += f'Дата: {today:%Y-%m-%d}\n\n'
+def parse_pk(model, value):
+    """
+    Приводит id из адреса к типу ключа модели; некорректный id и id вне
+    диапазона ключа — это 404.
+    """
+    try:
+        value = model._meta.pk.to_python(value)
+    except ValidationError:
+        raise NotFound()
+    bounds = pk_range(model)
+    if bounds is not None and not bounds[0] <= value <= bounds[1]:
+        raise NotFound()
+    return value
 
-    ingredient_lines = [
-        f'- {ingredient["ingredient__name"]} '
-        f'({ingredient["ingredient__measurement_unit"]}) - '
-        f'{ingredient["amount"]}'
-        for ingredient in ingredients
-    ]
-    shopping_list += '\n'.join(ingredient_lines)
-    shopping_list += f'\n\nFoodgram ({today:%Y})'
-    return shopping_list
+
+def relation_target(model, field_name, target_id):
+    """Модель, на которую ссылается поле связи, и id объекта из адреса."""
+    target = model._meta.get_field(field_name).related_model
+    return target, parse_pk(target, target_id)
+
+
+@atomic
+def add_relation_or_error(model, field_name, request, target_id, message):
+    """
+    Создаёт связь пользователя с объектом одним запросом. Только если
+    строка не вставилась, отдельный запрос выясняет причину: объекта нет
+    (404) или связь уже есть (400 с message).
+    """
+    target, target_id = relation_target(model, field_name, target_id)
+    instance = add_relation(model, field_name, request.user.id, target_id)
+    if instance is None:
+        if not target.objects.filter(pk=target_id).exists():
+            raise NotFound()
+        raise serializers.ValidationError({'errors': message})
+    return instance
+
+
+@atomic
+def remove_relation_or_error(model, field_name, request, target_id,
+                             message):
+    """Удаляет связь пользователя с объектом; ошибки как при создании."""
+    target, target_id = relation_target(model, field_name, target_id)
+    instance = remove_relation(model, field_name, request.user.id, target_id)
+    if instance is None:
+        if not target.objects.filter(pk=target_id).exists():
+            raise NotFound()
+        raise serializers.ValidationError({'errors': message})
+    return instance
+
+
+@atomic
+def bulk_relations(model, field_name, request, ids, excluded=()):
+    """
+    Добавляет (POST) или удаляет (DELETE) связи пользователя со всеми
+    объектами из ids: один запрос проверяет существование объектов,
+    ещё один меняет связи. Возвращает результат для каждого id: added
+    или exists, removed или absent, not_found для несуществующих
+    объектов и invalid для id из excluded.
+    """
+    target = model._meta.get_field(field_name).related_model
+    existing = set(
+        target.objects.filter(pk__in=ids).values_list('pk', flat=True)
+    )
+    valid = [pk for pk in ids if pk in existing and pk not in excluded]
+    if request.method == 'POST':
+        changed = add_relations(model, field_name, request.user.id, valid)
+        statuses = ('added', 'exists')
+    else:
+        changed = remove_relations(
+            model, field_name, request.user.id, valid
+        )
+        statuses = ('removed', 'absent')
+    changed = set(changed)
+    results = []
+    for pk in ids:
+        if pk not in existing:
+            result = 'not_found'
+        elif pk in excluded:
+            result = 'invalid'
+        else:
+            result = statuses[pk not in changed]
+        results.append({'id': pk, 'status': result})
+    return results
@@ -1,13 +1,17 @@
+from functools import partial
 from urllib.parse import unquote
 
+from django.conf import settings
 from django.contrib.auth import update_session_auth_hash
-from django.db.models import Exists, OuterRef, Sum, Value
-from django.shortcuts import HttpResponse
+from django.db.models import Exists, F, OuterRef, Value
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly
@@ -16,20 +20,35 @@ from rest_framework.response import Response
 
 from api import serializers
 from api.filters import RecipeFilter
+from recipes.feed import feed_recipe_ids
 from recipes.models import (
     Favorite,
-    IngredientRecipe,
+    ImageUpload,
     Recipe,
     ShoppingList,
     Tag,
 )
+from recipes.ranking import RANKINGS
 from users.models import Follow, User
-from .pagination import UserPagination
+from .autocomplete import ingredient_catalog
+from .cache import recipe_cache
+from .catalog import ingredient_list_response, tag_list_response
+from .pagination import FeedPagination, UserPagination
+from .pantry import pantry_catalog
+from .parsers import RecipeMultiPartParser
 from .permissions import AuthorOrReadOnly
+from .renderers import (
+    CSVShoppingListRenderer,
+    PDFShoppingListRenderer,
+    TextShoppingListRenderer,
+)
 from .utils import (
-    export_ingredients,
-    serializer_add_method,
-    serializer_delete_method
+    add_relation_or_error,
+    bulk_relations,
+    make_etag,
+    parse_pk,
+    relation_target,
+    remove_relation_or_error,
 )
 
 
@@ -44,6 +63,7 @@ class UserViewSet(
     """
     queryset = User.objects.all()
     pagination_class = UserPagination
+    cursor_ordering = 'id'
 
     def get_instance(self):
         return self.request.user
@@ -79,7 +99,7 @@ class UserViewSet(
         )
         serializer.is_valid(raise_exception=True)
         self.request.user.set_password(serializer.data['new_password'])
-        self.request.user.save()
+        self.request.user.save(update_fields=['password'])
         update_session_auth_hash(self.request, self.request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -90,7 +110,7 @@ class UserViewSet(
     def subscriptions(self, request):
         users = User.objects.filter(
             following__user=request.user
-        ).prefetch_related('recipes')
+        ).order_by('id')
         page = self.paginate_queryset(users)
 
         if page is not None:
@@ -105,21 +125,49 @@ class UserViewSet(
         )
         return Response(serializer.data)
 
-    @action(detail=True, methods=['post', 'delete'])
+    @action(
+        detail=True,
+        methods=['post', 'delete'],
+        permission_classes=(IsAuthenticated,),
+    )
     def subscribe(self, request, pk=None):
-        author = get_object_or_404(User, pk=pk)
-        follow, _ = Follow.objects.get_or_create(
-            user=request.user, author=author
-        )
-
         if request.method == 'POST':
+            _, author_id = relation_target(Follow, 'author', pk)
+            if author_id == request.user.id:
+                raise ValidationError(
+                    {'errors': 'Подписка на самого себя не возможна!'}
+                )
+            follow = add_relation_or_error(
+                Follow, 'author', request, author_id,
+                'Вы уже подписаны на этого пользователя',
+            )
             serializer = serializers.FollowSerializer(
                 follow, context={'request': request}
             )
-            return Response(serializer.data)
-        follow.delete()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        remove_relation_or_error(
+            Follow, 'author', request, pk,
+            'Вы не подписаны на этого пользователя',
+        )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='subscribe/bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def subscribe_bulk(self, request):
+        """Подписка на нескольких авторов и отписка от них одним запросом."""
+        serializer = serializers.BulkIdsSerializer(
+            data=request.data, context={'target': User}
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response(bulk_relations(
+            Follow, 'author', request, serializer.validated_data['ids'],
+            excluded={request.user.id},
+        ))
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -131,6 +179,9 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return tag_list_response.get().response(request)
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """Представление данных модели ингредиентов."""
@@ -140,25 +191,26 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend, )
     pagination_class = None
 
-    def get_queryset(self):
+    def get_search_limit(self):
+        try:
+            return max(int(self.request.query_params['limit']), 1)
+        except (KeyError, ValueError):
+            return settings.INGREDIENT_SEARCH_LIMIT
+
+    def list(self, request, *args, **kwargs):
         """
-        Переопределение запроса набора объектов ингредиентов в соответствии
-        с параметрами запроса.
+        Поиск ингредиентов по началу и части названия. Запрос обслуживается
+        индексом в памяти процесса, без обращения к базе данных. Без
+        параметра name отдаётся заранее собранный список всего справочника.
         """
-        name = self.request.query_params.get('name')
-        queryset = super().get_queryset()
-        if name:
-            if name.startswith('%'):
-                name = unquote(name)
-            else:
-                name = name.translate(
-                    str.maketrans(
-                        "qwertyuiop[]asdfghjkl;'zxcvbnm,./",
-                        "йцукенгшщзхъфывапролджэячсмитьбю."
-                    )
-                )
-            name = name.lower()
-        return queryset.filter(name__icontains=name)
+        name = request.query_params.get('name')
+        if not name:
+            return ingredient_list_response.get().response(request)
+        if name.startswith('%'):
+            name = unquote(name)
+        return Response(
+            ingredient_catalog.get().search(name, self.get_search_limit())
+        )
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -166,19 +218,103 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (AuthorOrReadOnly,)
     filterset_class = RecipeFilter
     pagination_class = UserPagination
+    parser_classes = (JSONParser, RecipeMultiPartParser)
+
+    @property
+    def cursor_ordering(self):
+        if self.request.query_params.get('ordering') in RANKINGS:
+            return ('-score', '-id')
+        return '-id'
 
     def get_queryset(self):
-        return Recipe.objects.annotate(
-            is_favorited=Exists(
-                self.request.user.favorites.filter(recipe=OuterRef('pk'))
-            )
-            if self.request.user.is_authenticated
-            else Value(False),
-            is_in_shopping_cart=Exists(
-                self.request.user.shopping_list.filter(recipe=OuterRef('pk'))
+        """
+        Рецепты вместе с автором и признаками, зависящими от пользователя.
+        Теги и ингредиенты догружает сериализатор только для рецептов,
+        которых нет в кэше фрагментов, подписку на автора он берёт
+        из множества подписок пользователя.
+        """
+        user = self.request.user
+        queryset = Recipe.objects.select_related('author')
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
             )
-            if self.request.user.is_authenticated
-            else Value(False),
+        # По id, чтобы не загружать пользователя, взятого из кэша токенов.
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user.id, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user.id, recipe=OuterRef('pk')
+            )),
+        )
+
+    def get_etag(self, *parts):
+        """
+        ETag ответа: состояние рецептов, версия избранного, покупок и
+        подписок пользователя и общая версия кэша рецептов, которую
+        поднимают изменения справочников и авторов.
+        """
+        user = self.request.user
+        return make_etag(
+            *parts,
+            user.pk,
+            getattr(user, 'interactions_version', 0),
+            recipe_cache.get_version(),
+        )
+
+    def conditional(self, etag, view, request, *args, **kwargs):
+        """Отвечает 304, если ETag клиента совпадает с текущим."""
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """
+        ETag списка строится по рецептам страницы, их датам изменения
+        и состоянию пагинации, без отдельного запроса по всей выборке.
+        Сериализация выполняется, только если ETag клиента устарел.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            recipes, state = list(queryset), None
+        else:
+            recipes, state = page, self.paginator.get_state()
+        etag = self.get_etag(
+            request.get_full_path(),
+            state,
+            *(
+                (recipe.id, recipe.updated_at.timestamp())
+                for recipe in recipes
+            ),
+        )
+
+        def respond(request):
+            serializer = self.get_serializer(recipes, many=True)
+            if page is None:
+                return Response(serializer.data)
+            return self.get_paginated_response(serializer.data)
+
+        return self.conditional(etag, respond, request)
+
+    def get_object(self):
+        parse_pk(Recipe, self.kwargs['pk'])
+        return super().get_object()
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = parse_pk(Recipe, kwargs['pk'])
+        updated_at = Recipe.objects.filter(pk=pk).values_list(
+            'updated_at', flat=True
+        ).first()
+        if updated_at is None:
+            raise Http404
+        etag = self.get_etag(pk, updated_at.timestamp())
+        return self.conditional(
+            etag, super().retrieve, request, *args, **kwargs
         )
 
     def get_serializer_class(self):
@@ -191,6 +327,91 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
         return super().get_permissions()
 
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """
+        Новые рецепты авторов, на которых подписан пользователь. Id
+        страницы берутся из ленты, затем читаются только её рецепты.
+        """
+        paginator = FeedPagination()
+        ids = paginator.paginate_ids(
+            partial(feed_recipe_ids, request.user.id), request
+        )
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def pantry(self, request):
+        """
+        Рецепты из имеющихся ингредиентов ?ingredients=1,2,3: сначала те,
+        где недостаёт меньше всего, затем с большей долей покрытия.
+        """
+        try:
+            ingredients = [
+                int(value)
+                for values in request.query_params.getlist('ingredients')
+                for value in values.split(',') if value
+            ]
+        except ValueError:
+            ingredients = None
+        if not ingredients:
+            return Response(
+                {'ingredients': 'Укажите id ингредиентов через запятую.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = min(
+                max(int(request.query_params['limit']), 1),
+                settings.PANTRY_SEARCH_MAX_LIMIT,
+            )
+        except (KeyError, ValueError):
+            limit = settings.PANTRY_SEARCH_LIMIT
+        index = pantry_catalog.get()
+        count = limit
+        while True:
+            ids, matched, sizes, total = index.rank(ingredients, count)
+            recipes = self.get_queryset().in_bulk(ids.tolist())
+            # Удалённые после сборки индекса рецепты не находятся в базе,
+            # тогда берётся больше кандидатов.
+            if len(recipes) >= limit or count >= total:
+                break
+            count *= 2
+        found = [
+            (recipes[recipe_id], int(matched_count), int(size))
+            for recipe_id, matched_count, size in zip(
+                ids.tolist(), matched, sizes
+            )
+            if recipe_id in recipes
+        ][:limit]
+        data = self.get_serializer(
+            [recipe for recipe, _, _ in found], many=True
+        ).data
+        for item, (_, matched_count, size) in zip(data, found):
+            item['matched_count'] = matched_count
+            item['missing_count'] = size - matched_count
+        return Response(data)
+
+    @action(detail=True)
+    def similar(self, request, pk):
+        """
+        Похожие рецепты по ингредиентам и тегам из таблицы, которую
+        строит команда build_similar.
+        """
+        pk = parse_pk(Recipe, pk)
+        recipes = list(
+            self.get_queryset()
+            .filter(similar_to__recipe_id=pk)
+            .annotate(score=F('similar_to__score'))
+            .order_by('-score')
+        )
+        if not recipes and not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
@@ -200,16 +421,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = serializers.FavoriteSerializer(
             context={'request': request})
         if request.method == 'POST':
-            serializer_add_method(
-                serializers.FavoriteSerializer,
-                request,
-                pk
+            add_relation_or_error(
+                Favorite, 'recipe', request, pk,
+                'Этот рецепт уже добавлен в избранное.',
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        serializer_delete_method(
-            Favorite,
-            request,
-            pk
+        remove_relation_or_error(
+            Favorite, 'recipe', request, pk,
+            'Этого рецепта нет в избранном.',
         )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -222,35 +441,136 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = serializers.ShoppingListSerializer(
             context={'request': request})
         if request.method == 'POST':
-            serializer_add_method(
-                serializers.ShoppingListSerializer,
-                request,
-                pk
+            add_relation_or_error(
+                ShoppingList, 'recipe', request, pk,
+                'Этот рецепт уже добавлен в список покупок.',
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        serializer_delete_method(
-            ShoppingList,
-            request,
-            pk
+        remove_relation_or_error(
+            ShoppingList, 'recipe', request, pk,
+            'Этого рецепта нет в списке покупок.',
         )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def bulk_response(self, model, request):
+        serializer = serializers.BulkIdsSerializer(
+            data=request.data, context={'target': Recipe}
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response(bulk_relations(
+            model, 'recipe', request, serializer.validated_data['ids']
+        ))
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='favorite/bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_bulk(self, request):
+        """Добавление в избранное и удаление из него списка рецептов."""
+        return self.bulk_response(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='shopping_cart/bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_bulk(self, request):
+        """Добавление в корзину и удаление из неё списка рецептов."""
+        return self.bulk_response(ShoppingList, request)
+
+    @action(
+        detail=False,
+        url_path='shopping_cart/summary',
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_summary(self, request):
+        """Итоги списка покупок: ингредиенты с суммарным количеством."""
+        items = request.user.cart_ingredients.select_related(
+            'ingredient'
+        ).order_by('ingredient__name')
+        serializer = serializers.CartIngredientSerializer(items, many=True)
+        return Response(serializer.data)
+
     @action(
-        detail=False, methods=['GET'], permission_classes=(IsAuthenticated,)
+        detail=False,
+        methods=['GET'],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            TextShoppingListRenderer,
+            CSVShoppingListRenderer,
+            PDFShoppingListRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
-        ingredients = (
-            IngredientRecipe.objects.filter(
-                recipe__shopping_list__user=self.request.user
-            )
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .order_by('ingredient__name')
-            .annotate(amount=Sum('amount'))
-        )
-        filename = 'shopping_list.txt'
-        shopping_list = export_ingredients(self, request, ingredients)
-        response = HttpResponse(
-            shopping_list, content_type='text/plain; charset=utf-8'
+        """
+        Выгрузка списка покупок в формате ?format=txt|csv|pdf. Строки читаются
+        из базы курсором и сразу передаются клиенту.
+        """
+        ingredients = request.user.cart_ingredients.values(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).order_by('ingredient__name')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(
+                request.user,
+                ingredients.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE),
+            ),
+            content_type=renderer.content_type,
         )
+        filename = f'shopping_list.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
+
+
+class ImageUploadViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Загрузка картинки рецепта частями. POST с размером файла возвращает
+    токен, PATCH с заголовком Upload-Offset дописывает тело запроса
+    с этой позиции, GET показывает, сколько уже загружено, чтобы
+    продолжить после обрыва. Готовая картинка передаётся в рецепт
+    строкой upload:<токен>.
+    """
+    serializer_class = serializers.ImageUploadSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return ImageUpload.objects.filter(user=self.request.user)
+
+    def partial_update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        offset = request.META.get('HTTP_UPLOAD_OFFSET')
+        if offset != str(upload.offset):
+            return Response(
+                {'errors': 'Неверное смещение.', 'offset': upload.offset},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if not 0 < length <= upload.size - upload.offset:
+            return Response(
+                {'errors': 'Неверный размер части.', 'offset': upload.offset},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        written = upload.write(request.stream, length)
+        # Смещение двигается, только если за это время его не сдвинул
+        # параллельный запрос с той же позицией.
+        if not ImageUpload.objects.filter(
+            pk=upload.pk, offset=upload.offset
+        ).update(offset=upload.offset + written):
+            upload.refresh_from_db()
+            return Response(
+                {'errors': 'Неверное смещение.', 'offset': upload.offset},
+                status=status.HTTP_409_CONFLICT,
+            )
+        upload.offset += written
+        return Response(self.get_serializer(upload).data)
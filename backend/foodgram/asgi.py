@@ -1,7 +1,33 @@
+import asyncio
 import os
 
+from asgiref.sync import ThreadSensitiveContext
 from django.core.asgi import get_asgi_application
+from django.urls import Resolver404, resolve
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ROOT_URLCONF', 'foodgram.asgi_urls')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+def is_async_view(path):
+    try:
+        return asyncio.iscoroutinefunction(resolve(path).func)
+    except Resolver404:
+        return False
+
+
+async def application(scope, receive, send):
+    """
+    Django 3.2 выполняет синхронный код всех запросов в одном общем потоке.
+    Запросы к синхронным представлениям, в том числе запись, получают
+    свой контекст с отдельным потоком и работают параллельно. Асинхронным
+    представлениям он не нужен: базу они читают в пуле потоков,
+    а лишний поток на запрос заметно снижает их пропускную способность.
+    """
+    if scope['type'] != 'http' or is_async_view(scope['path']):
+        await django_application(scope, receive, send)
+        return
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
@@ -45,7 +45,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+# foodgram/asgi.py подставляет адреса с асинхронным чтением.
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', default='foodgram.urls')
 
 TEMPLATES = [
     {
@@ -81,6 +82,77 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipes': {
+        # Для нескольких воркеров gunicorn используйте общий бэкенд, например
+        # django.core.cache.backends.filebased.FileBasedCache.
+        'BACKEND': os.getenv(
+            'RECIPE_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('RECIPE_CACHE_LOCATION', default='recipes'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RECIPE_CACHE_ALIAS = 'recipes'
+RECIPE_CACHE_TIMEOUT = 60 * 60 * 24
+FOLLOWED_AUTHORS_TIMEOUT = 60 * 60
+
+# Пользователи по токену: в памяти процесса или, если задан псевдоним,
+# в общем кэше, например RECIPE_CACHE_ALIAS. С несколькими воркерами
+# без общего кэша отозванный токен действует в других процессах до TTL.
+AUTH_TOKEN_CACHE_ALIAS = os.getenv('AUTH_TOKEN_CACHE_ALIAS') or None
+AUTH_TOKEN_CACHE_SIZE = 10_000
+AUTH_TOKEN_CACHE_TTL = 60
+
+INGREDIENT_SEARCH_LIMIT = 50
+# Сколько id принимают массовые операции с избранным, корзиной и подписками.
+BULK_RELATIONS_LIMIT = 500
+INGREDIENT_INDEX_TTL = 60 * 5
+CATALOG_RESPONSE_TTL = 60 * 5
+
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+
+# Загружаемые файлы сразу пишутся во временный файл, а не в память.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_UPLOAD_DIR = os.getenv(
+    'IMAGE_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'uploads')
+)
+IMAGE_UPLOAD_TTL = 60 * 60 * 24
+
+# Рецепты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT, не
+# раскладываются по лентам, а подмешиваются при чтении.
+FEED_TIMELINE_LENGTH = 1000
+FEED_TRIM_SLACK = 100
+FEED_FANOUT_LIMIT = 10_000
+# Столько подписчиков раскладывается сразу при публикации, остальные —
+# командой fan_out.
+FEED_FANOUT_BATCH = 1000
+
+PANTRY_SEARCH_LIMIT = 20
+PANTRY_SEARCH_MAX_LIMIT = 100
+# Индекс «что приготовить» живёт в памяти каждого процесса: версия состава
+# рецептов читается из базы, по ней процессы догружают изменения.
+PANTRY_INDEX_TTL = 60 * 60
+PANTRY_SYNC_MARGIN = 60
+
+SIMILAR_RECIPES_TOP_K = 12
+SIMILAR_RECIPES_BATCH = 5000
+
+EXPORT_CHUNK_SIZE = 2000
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -134,7 +206,7 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.PageNumberPagination',
@@ -55,6 +55,7 @@ class RecipesAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
+        'favorites_count',
     )
     list_filter = (
         'name',
@@ -62,14 +63,6 @@ class RecipesAdmin(admin.ModelAdmin):
         'tags',
     )
 
-    readonly_fields = ('favorites_count',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
 
     inlines = (IngredientsInline,)
-
-    @admin.display(description='В избранном')
-    def favorites_count(self, obj):
-        """
-        Отображение количества раз, когда рецепт был добавлен кем-либо в список
-        избранного.
-        """
-        return obj.favorites.count()
@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import CartIngredient, IngredientRecipe, ShoppingList
+
+
+def recipe_totals(recipe_ids):
+    """Количество каждого ингредиента на все рецепты: {id: количество}."""
+    return dict(
+        IngredientRecipe.objects.filter(recipe__in=recipe_ids)
+        .order_by()
+        .values('ingredient')
+        .annotate(total=Sum('amount'))
+        .values_list('ingredient', 'total')
+    )
+
+
+def cart_users(recipe_ids):
+    """id пользователей, у которых хотя бы один из рецептов в корзине."""
+    return list(
+        ShoppingList.objects.filter(recipe__in=recipe_ids)
+        .order_by('user_id')
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+
+
+def shift_carts(user_ids, deltas):
+    """
+    Сдвигает итоги корзин пользователей на deltas {id ингредиента:
+    изменение количества}: недостающие строки создаются, затем все
+    изменения вносятся одним UPDATE, обнулившиеся строки удаляются.
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not user_ids or not deltas:
+        return
+    CartIngredient.objects.bulk_create(
+        (
+            CartIngredient(user_id=user_id, ingredient_id=ingredient_id)
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items() if delta > 0
+        ),
+        ignore_conflicts=True,
+    )
+    items = CartIngredient.objects.filter(
+        user__in=user_ids, ingredient__in=deltas
+    )
+    items.update(amount=Greatest(
+        F('amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        0,
+    ))
+    items.filter(amount=0).delete()
+
+
+def add_to_cart(user_id, recipe_ids):
+    shift_carts([user_id], recipe_totals(recipe_ids))
+
+
+def remove_from_cart(user_id, recipe_ids):
+    shift_carts([user_id], {
+        ingredient_id: -total
+        for ingredient_id, total in recipe_totals(recipe_ids).items()
+    })
+
+
+def change_recipe_ingredients(recipe_id, deltas):
+    """Переносит изменение ингредиентов рецепта в корзины с ним."""
+    if any(deltas.values()):
+        shift_carts(cart_users([recipe_id]), deltas)
+
+
+def rebuild_carts(batch_size=5000, user_ids=None):
+    """
+    Собирает итоги корзин заново из списков покупок: всех пользователей
+    или только user_ids. Возвращает число строк.
+    """
+    items = CartIngredient.objects.all()
+    carts = ShoppingList.objects.all()
+    if user_ids is not None:
+        items = items.filter(user__in=user_ids)
+        carts = carts.filter(user__in=user_ids)
+    totals = (
+        carts.order_by()
+        .values('user', 'recipe__ingredient_list__ingredient')
+        .annotate(total=Sum('recipe__ingredient_list__amount'))
+        .values_list('user', 'recipe__ingredient_list__ingredient', 'total')
+    )
+    total = 0
+    with transaction.atomic():
+        items.delete()
+        batch = []
+        for user_id, ingredient_id, amount in totals.iterator():
+            if ingredient_id is None:
+                continue
+            batch.append(CartIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            ))
+            if len(batch) >= batch_size:
+                CartIngredient.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        CartIngredient.objects.bulk_create(batch)
+    return total + len(batch)
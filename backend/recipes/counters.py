@@ -0,0 +1,53 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+class CounterFieldsMixin:
+    """
+    Модель со счётчиками, которые меняют только UPDATE с F() из сигналов.
+    Обычное сохранение загруженной строки пишет все поля, кроме
+    counter_fields, иначе оно вернуло бы в базу значения, прочитанные
+    вместе со строкой, и отменило бы одновременные изменения счётчиков.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+def shift_counter(queryset, field, delta):
+    """Атомарно изменяет счётчик на delta, не опуская его ниже нуля."""
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def recount(queryset, field, related_model, related_field):
+    """
+    Пересчитывает счётчик по связанной модели одним UPDATE.
+    Возвращает количество исправленных строк.
+    """
+    actual = Coalesce(
+        Subquery(
+            related_model._default_manager.filter(
+                **{related_field: OuterRef('pk')}
+            )
+            .order_by()
+            .values(related_field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+    return queryset.exclude(**{field: actual}).update(**{field: actual})
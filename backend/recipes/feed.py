@@ -0,0 +1,200 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from users.models import Follow, User
+from .counters import recount, shift_counter
+from .models import FanOutTask, Recipe, TimelineEntry
+from .querysets import limit_per_group
+
+
+def is_popular(author_id):
+    """
+    У автора слишком много подписчиков, чтобы раскладывать его рецепты
+    по лентам: они подмешиваются в ленту при чтении.
+    """
+    return User.objects.filter(
+        pk=author_id, followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def trim_timelines(user_ids):
+    """Оставляет в лентах пользователей FEED_TIMELINE_LENGTH новых записей."""
+    entries = TimelineEntry.objects.filter(user_id__in=user_ids)
+    kept = limit_per_group(
+        entries.order_by('-recipe_id'), 'user', settings.FEED_TIMELINE_LENGTH
+    )
+    entries.exclude(pk__in=kept.values('pk')).delete()
+    recount(
+        User.objects.filter(pk__in=user_ids),
+        'timeline_size', TimelineEntry, 'user',
+    )
+
+
+def add_to_timelines(user_ids, recipe_ids):
+    """
+    Добавляет рецепты в ленты пользователей. Записи, которые уже есть
+    в лентах, не вставляются и не увеличивают timeline_size. Ленту
+    обрезают, только когда она вырастает на FEED_TRIM_SLACK записей сверх
+    длины, чтобы не пересчитывать её при каждой публикации.
+    """
+    existing = set(
+        TimelineEntry.objects.filter(
+            user_id__in=user_ids, recipe_id__in=recipe_ids
+        ).values_list('user_id', 'recipe_id')
+    )
+    entries = [
+        TimelineEntry(user_id=user_id, recipe_id=recipe_id)
+        for user_id in user_ids
+        for recipe_id in recipe_ids
+        if (user_id, recipe_id) not in existing
+    ]
+    # Одновременную вставку той же записи пропускает ignore_conflicts,
+    # счётчик тогда исправит пересчёт при обрезке ленты.
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    added = Counter(entry.user_id for entry in entries)
+    users_by_count = defaultdict(list)
+    for user_id, count in added.items():
+        users_by_count[count].append(user_id)
+    for count, counted_users in users_by_count.items():
+        shift_counter(
+            User.objects.filter(pk__in=counted_users), 'timeline_size', count
+        )
+    overflow = list(
+        User.objects.filter(
+            pk__in=list(added),
+            timeline_size__gt=(
+                settings.FEED_TIMELINE_LENGTH + settings.FEED_TRIM_SLACK
+            ),
+        ).values_list('pk', flat=True)
+    )
+    if overflow:
+        trim_timelines(overflow)
+
+
+def fan_out_batch(recipe_id, author_id, last_user_id):
+    """
+    Раскладывает рецепт по лентам следующих FEED_FANOUT_BATCH подписчиков
+    с id больше last_user_id. Возвращает id последнего из них или None,
+    если подписчиков больше нет.
+    """
+    batch = list(
+        Follow.objects.filter(author_id=author_id, user_id__gt=last_user_id)
+        .order_by('user_id')
+        .values_list('user_id', flat=True)[:settings.FEED_FANOUT_BATCH]
+    )
+    if not batch:
+        return None
+    add_to_timelines(batch, [recipe_id])
+    if len(batch) < settings.FEED_FANOUT_BATCH:
+        return None
+    return batch[-1]
+
+
+def fan_out(recipe_id, author_id):
+    """
+    Раскладывает новый рецепт по лентам подписчиков. Сразу обрабатывается
+    одна пачка, чтобы запрос публикации не ждал раскладки по всем
+    подписчикам; если подписчиков больше, остаток ставится в FanOutTask
+    для команды fan_out.
+    """
+    if is_popular(author_id):
+        return
+    with transaction.atomic():
+        last_user_id = fan_out_batch(recipe_id, author_id, 0)
+        if last_user_id is not None:
+            FanOutTask.objects.create(
+                recipe_id=recipe_id, last_user_id=last_user_id
+            )
+
+
+def run_fan_out_tasks():
+    """
+    Дораскладывает рецепты из FanOutTask пачками. После каждой пачки
+    позиция сохраняется, поэтому прерванная команда продолжает с неё.
+    Возвращает количество завершённых задач.
+    """
+    done = 0
+    for task in FanOutTask.objects.select_related('recipe').order_by('pk'):
+        while task.last_user_id is not None:
+            with transaction.atomic():
+                task.last_user_id = fan_out_batch(
+                    task.recipe_id, task.recipe.author_id, task.last_user_id
+                )
+                if task.last_user_id is None:
+                    task.delete()
+                else:
+                    task.save(update_fields=['last_user_id'])
+        done += 1
+    return done
+
+
+def backfill(user_id, author_ids):
+    """Добавляет в ленту последние рецепты авторов после подписки."""
+    recipe_ids = list(
+        Recipe.objects.filter(
+            author__in=author_ids,
+            author__followers_count__lte=settings.FEED_FANOUT_LIMIT,
+        )
+        .order_by('-id')
+        .values_list('id', flat=True)[:settings.FEED_TIMELINE_LENGTH]
+    )
+    if recipe_ids:
+        add_to_timelines([user_id], recipe_ids)
+
+
+def unfollow(user_id, author_ids):
+    """Убирает рецепты авторов из ленты после отписки."""
+    deleted, _ = TimelineEntry.objects.filter(
+        user_id=user_id, recipe__author_id__in=author_ids
+    ).delete()
+    shift_counter(User.objects.filter(pk=user_id), 'timeline_size', -deleted)
+
+
+def rebuild_timeline(user_id):
+    """Собирает ленту пользователя заново по его текущим подпискам."""
+    recipe_ids = list(
+        Recipe.objects.filter(
+            author__following__user_id=user_id,
+            author__followers_count__lte=settings.FEED_FANOUT_LIMIT,
+        )
+        .order_by('-id')
+        .values_list('id', flat=True)[:settings.FEED_TIMELINE_LENGTH]
+    )
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    TimelineEntry.objects.bulk_create(
+        TimelineEntry(user_id=user_id, recipe_id=recipe_id)
+        for recipe_id in recipe_ids
+    )
+    User.objects.filter(pk=user_id).update(timeline_size=len(recipe_ids))
+
+
+def feed_recipe_ids(user_id, before, count):
+    """
+    Id рецептов ленты по убыванию, меньшие before, не больше count.
+    Записи ленты читаются диапазоном по индексу (user, recipe), последние
+    рецепты популярных авторов, на которых подписан пользователь, —
+    отдельным запросом с тем же ограничением.
+    """
+    timeline = TimelineEntry.objects.filter(user_id=user_id)
+    popular_authors = list(
+        Follow.objects.filter(
+            user_id=user_id,
+            author__followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).values_list('author_id', flat=True)
+    )
+    popular = Recipe.objects.filter(author_id__in=popular_authors)
+    if before is not None:
+        timeline = timeline.filter(recipe_id__lt=before)
+        popular = popular.filter(pk__lt=before)
+    recipe_ids = set(
+        timeline.order_by('-recipe_id').values_list(
+            'recipe_id', flat=True
+        )[:count]
+    )
+    if popular_authors:
+        recipe_ids.update(
+            popular.order_by('-pk').values_list('pk', flat=True)[:count]
+        )
+    return sorted(recipe_ids, reverse=True)[:count]
@@ -0,0 +1,111 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+RENDITIONS_DIR = 'recipes/renditions'
+
+# Название: (размер, обрезать до точного размера).
+RENDITIONS = {
+    'full': ((1280, 1280), False),
+    'card': ((600, 400), True),
+    'thumbnail': ((160, 160), True),
+}
+FORMATS = (
+    ('jpg', 'JPEG'),
+    ('webp', 'WEBP'),
+)
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+def validate_recipe_image(file):
+    """Проверяет размер файла, формат и количество пикселей картинки."""
+    if file.size > settings.RECIPE_IMAGE_MAX_SIZE:
+        raise ValidationError(
+            'Размер картинки не должен превышать '
+            f'{settings.RECIPE_IMAGE_MAX_SIZE // (1024 * 1024)} МБ.'
+        )
+    position = file.tell()
+    try:
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Загрузите корректную картинку.')
+    finally:
+        file.seek(position)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            f'Допустимые форматы: {", ".join(ALLOWED_FORMATS)}.'
+        )
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ValidationError('Слишком большое разрешение картинки.')
+
+
+def to_rgb(image):
+    """Поворачивает по EXIF и убирает прозрачность и метаданные."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render(image, size, crop):
+    if crop:
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    return image
+
+
+def process_image(file):
+    """
+    Сохраняет варианты картинки в JPEG и WebP под именами с хэшем
+    содержимого и возвращает {название: {расширение: путь}}. Пиксели
+    перекодируются заново, поэтому EXIF и прочие метаданные не попадают
+    в сохранённые файлы.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    digest = digest.hexdigest()[:20]
+    file.seek(0)
+    with Image.open(file) as original:
+        image = to_rgb(original)
+    renditions = {}
+    for name, (size, crop) in RENDITIONS.items():
+        rendition = None
+        renditions[name] = {}
+        for extension, image_format in FORMATS:
+            path = f'{RENDITIONS_DIR}/{digest}-{name}.{extension}'
+            if not default_storage.exists(path):
+                rendition = rendition or render(image, size, crop)
+                output = io.BytesIO()
+                rendition.save(
+                    output, image_format, quality=85, optimize=True
+                )
+                path = default_storage.save(
+                    path, ContentFile(output.getvalue())
+                )
+            renditions[name][extension] = path
+    return renditions
+
+
+def rendition_urls(renditions, build_url=None):
+    """URL вариантов картинки для ответа API."""
+    return {
+        name: {
+            extension: (
+                build_url(default_storage.url(path)) if build_url
+                else default_storage.url(path)
+            )
+            for extension, path in files.items()
+        }
+        for name, files in (renditions or {}).items()
+    }
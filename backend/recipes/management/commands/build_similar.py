@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.similarity import build_similar, refresh_similar
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит таблицу похожих рецептов по ингредиентам и тегам. '
+        'С --minutes или --recipes пересчитывает только затронутые рецепты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes', type=int,
+            help='Обновить рецепты, изменённые за последние N минут.',
+        )
+        parser.add_argument(
+            '--recipes', type=int, nargs='+',
+            help='Обновить перечисленные рецепты.',
+        )
+        parser.add_argument(
+            '--top-k', type=int,
+            help='Количество соседей у рецепта.',
+        )
+
+    def handle(self, *args, **options):
+        changed = set(options['recipes'] or ())
+        if options['minutes'] is not None:
+            since = timezone.now() - timedelta(minutes=options['minutes'])
+            changed.update(
+                Recipe.objects.filter(updated_at__gte=since).values_list(
+                    'id', flat=True
+                )
+            )
+        elif not changed:
+            total = build_similar(options['top_k'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Похожие рецепты построены: {total}')
+            )
+            return
+        total = refresh_similar(changed, options['top_k'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Похожие рецепты обновлены: {total}')
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import run_fan_out_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Дораскладывает новые рецепты по лентам подписчиков, которые '
+        'не поместились в первую пачку при публикации. Запускается '
+        'периодически.'
+    )
+
+    def handle(self, *args, **options):
+        done = run_fan_out_tasks()
+        self.stdout.write(self.style.SUCCESS(f'Разложено рецептов: {done}'))
@@ -0,0 +1,259 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import CatalogVersion, Ingredient, Tag
+
+DATA_DIR = settings.BASE_DIR.parent / 'data'
+
+
+def iter_json_array(file, chunk_size=1 << 16):
+    """Читает элементы JSON-массива по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, position, started, eof = '', 0, False, False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise CommandError('Ожидается JSON-массив.')
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+        if end is not None and (end < len(buffer) or eof):
+            yield item
+            position = end
+            continue
+        if eof:
+            raise CommandError('Файл обрывается посреди JSON-массива.')
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class RowsFile(io.TextIOBase):
+    """Файлоподобный объект со строками CSV для COPY FROM STDIN."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            writer.writerow(row)
+            self.buffer += output.getvalue()
+            output.seek(0)
+            output.truncate()
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает справочники ингредиентов и тегов из JSON. Повторный '
+        'запуск только добавляет новые и обновляет изменённые записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients', default=DATA_DIR / 'ingredients.json',
+            help='Путь к JSON-файлу ингредиентов.',
+        )
+        parser.add_argument(
+            '--tags', default=DATA_DIR / 'tags.json',
+            help='Путь к JSON-файлу тегов.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество записей в одной пачке.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            for title, path, load, model in (
+                (
+                    'Ингредиенты', options['ingredients'],
+                    self.load_ingredients, Ingredient,
+                ),
+                ('Теги', options['tags'], self.load_tags, Tag),
+            ):
+                try:
+                    with open(path, encoding='utf-8') as file:
+                        inserted, updated, skipped = load(
+                            iter_json_array(file)
+                        )
+                except OSError as error:
+                    raise CommandError(error)
+                # Массовые вставки не вызывают сигналы моделей.
+                if inserted or updated:
+                    CatalogVersion.touch(model)
+                self.stdout.write(
+                    f'{title}: добавлено {inserted}, обновлено {updated}, '
+                    f'пропущено {skipped}'
+                )
+        self.stdout.write(self.style.SUCCESS('Справочники загружены.'))
+
+    def ingredient_rows(self, items, counter):
+        for item in items:
+            counter['total'] += 1
+            name = item.get('name')
+            measurement_unit = item.get('measurement_unit')
+            if name and measurement_unit:
+                yield name, measurement_unit
+
+    def load_ingredients(self, items):
+        counter = {'total': 0}
+        rows = self.ingredient_rows(items, counter)
+        if connection.vendor == 'postgresql':
+            inserted = self.copy_ingredients(rows)
+        else:
+            inserted = 0
+            batch_size = min(
+                self.batch_size,
+                connection.features.max_query_params or self.batch_size,
+            )
+            for batch in batched(rows, batch_size):
+                inserted += self.insert_ingredients(set(batch))
+        return inserted, 0, counter['total'] - inserted
+
+    def insert_ingredients(self, keys):
+        existing = set(
+            Ingredient.objects.filter(
+                name__in={name for name, _ in keys}
+            ).values_list('name', 'measurement_unit')
+        )
+        new = [
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in keys - existing
+        ]
+        Ingredient.objects.bulk_create(new, ignore_conflicts=True)
+        return len(new)
+
+    def copy_ingredients(self, rows):
+        """COPY во временную таблицу и одна вставка с ON CONFLICT."""
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_staging '
+                '(name text, measurement_unit text)'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_staging FROM STDIN WITH (FORMAT csv)',
+                RowsFile(rows),
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            inserted = cursor.rowcount
+            # ON COMMIT DROP не сработал бы, если команду вызывают внутри
+            # внешней транзакции: второй вызов не создал бы таблицу.
+            cursor.execute('DROP TABLE ingredient_staging')
+            return inserted
+
+    def read_tags(self, items):
+        """
+        Теги из файла по slug. Повторы одного тега пропускаются, разные
+        данные под одним slug и один цвет у разных тегов — ошибка.
+        """
+        tags, skipped = {}, 0
+        for item in items:
+            slug, name, color = (
+                item.get('slug'), item.get('name'), item.get('color')
+            )
+            if not (slug and name and color):
+                skipped += 1
+                continue
+            if slug in tags:
+                if tags[slug] != (name, color):
+                    raise CommandError(
+                        f'Тег {slug} описан в файле несколько раз '
+                        'с разными данными.'
+                    )
+                skipped += 1
+                continue
+            tags[slug] = (name, color)
+        return tags, skipped
+
+    def check_colors(self, tags):
+        """Цвет уникален: после загрузки у каждого тега должен быть свой."""
+        colors = dict(Tag.objects.values_list('slug', 'color'))
+        colors.update((slug, color) for slug, (_, color) in tags.items())
+        owners = {}
+        for slug, color in colors.items():
+            owners.setdefault(color, []).append(slug)
+        conflicts = [
+            f'{color}: {", ".join(sorted(slugs))}'
+            for color, slugs in owners.items() if len(slugs) > 1
+        ]
+        if conflicts:
+            raise CommandError(
+                'Один цвет у нескольких тегов: ' + '; '.join(conflicts)
+            )
+
+    def load_tags(self, items):
+        """
+        Тегов единицы, поэтому они читаются целиком. Изменённые теги
+        сначала получают временные цвета, которые не проходят валидацию
+        и не совпадают с настоящими: так цвета можно поменять местами,
+        не нарушая уникальности посреди обновления.
+        """
+        tags, skipped = self.read_tags(items)
+        self.check_colors(tags)
+        existing = Tag.objects.in_bulk(list(tags), field_name='slug')
+        new, changed = [], []
+        for slug, (name, color) in tags.items():
+            tag = existing.get(slug)
+            if tag is None:
+                new.append(Tag(slug=slug, name=name, color=color))
+            elif (tag.name, tag.color) != (name, color):
+                changed.append(tag)
+            else:
+                skipped += 1
+        recolored = [tag for tag in changed if tag.color != tags[tag.slug][1]]
+        for index, tag in enumerate(recolored):
+            tag.color = f'~{index}'
+        Tag.objects.bulk_update(
+            recolored, ('color',), batch_size=self.batch_size
+        )
+        for tag in changed:
+            tag.name, tag.color = tags[tag.slug]
+        Tag.objects.bulk_update(
+            changed, ('name', 'color'), batch_size=self.batch_size
+        )
+        Tag.objects.bulk_create(new, batch_size=self.batch_size)
+        return len(new), len(changed), skipped
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import ImageUpload
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет загрузки картинок частями, начатые раньше чем '
+        'IMAGE_UPLOAD_TTL секунд назад, вместе с их файлами.'
+    )
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(
+            seconds=settings.IMAGE_UPLOAD_TTL
+        )
+        deleted, _ = ImageUpload.objects.filter(created__lt=deadline).delete()
+        self.stdout.write(self.style.SUCCESS(f'Удалено загрузок: {deleted}'))
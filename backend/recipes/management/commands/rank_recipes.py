@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.ranking import rank_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги рецептов для сортировки ?ordering=popular '
+        'и ?ordering=trending. Запускается периодически.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество рейтингов в одной вставке.',
+        )
+
+    def handle(self, *args, **options):
+        total = rank_recipes(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Рейтинги пересчитаны: {total}')
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.carts import rebuild_carts
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает итоги списков покупок заново из рецептов в корзинах. '
+        'Нужна после массовых изменений в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество строк в одной вставке.',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_carts(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Итоги списков покупок собраны: {total}')
+        )
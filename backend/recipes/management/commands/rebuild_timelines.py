@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_timeline
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает ленты подписок заново. Нужна после первого развёртывания '
+        'лент и после изменения FEED_FANOUT_LIMIT.'
+    )
+
+    def handle(self, *args, **options):
+        user_ids = Follow.objects.order_by('user_id').values_list(
+            'user_id', flat=True
+        ).distinct()
+        total = 0
+        for user_id in list(user_ids):
+            with transaction.atomic():
+                rebuild_timeline(user_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Собрано лент: {total}'))
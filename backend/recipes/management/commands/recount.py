@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+from recipes.models import TimelineEntry
+from recipes.signals import COUNTERS
+from users.models import User
+
+# Размер ленты поддерживается не сигналами, а кодом раскладки по лентам.
+TIMELINE_COUNTER = (TimelineEntry, User, 'user', 'timeline_size')
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики избранного, списков '
+        'покупок, рецептов, подписчиков и размеры лент подписок.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for sender, model, foreign_key, field in (
+                *COUNTERS, TIMELINE_COUNTER
+            ):
+                fixed = recount(
+                    model.objects.all(), field, sender, foreign_key
+                )
+                self.stdout.write(
+                    f'{model.__name__}.{field}: исправлено {fixed}'
+                )
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
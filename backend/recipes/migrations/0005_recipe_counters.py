@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+from recipes.counters import recount
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    ShoppingList = apps.get_model('recipes', 'ShoppingList')
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+
+    recount(Recipe.objects.all(), 'favorites_count', Favorite, 'recipe')
+    recount(Recipe.objects.all(), 'in_carts_count', ShoppingList, 'recipe')
+    recount(User.objects.all(), 'recipes_count', Recipe, 'author')
+    recount(User.objects.all(), 'followers_count', Follow, 'author')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_add_tags'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.2 on 2026-10-18 02:52
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Django строит icontains как UPPER(name) LIKE UPPER(%s), поэтому
+# триграммные индексы создаются по тому же выражению.
+CREATE_SEARCH_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ingredient_name_trgm '
+    'ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS recipe_name_trgm '
+    'ON recipes_recipe USING gin (UPPER(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector '
+    'ON recipes_recipe USING gin (search_vector)',
+    """
+    UPDATE recipes_recipe AS recipe SET search_vector =
+        setweight(to_tsvector('russian', recipe.name), 'A')
+        || setweight(to_tsvector('russian', COALESCE((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_ingredientrecipe AS item
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = item.ingredient_id
+            WHERE item.recipe_id = recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector('russian', recipe.text), 'C')
+    """,
+]
+
+DROP_SEARCH_INDEXES = [
+    'DROP INDEX IF EXISTS recipe_search_vector',
+    'DROP INDEX IF EXISTS recipe_name_trgm',
+    'DROP INDEX IF EXISTS ingredient_name_trgm',
+]
+
+
+def run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_on_postgres(CREATE_SEARCH_INDEXES),
+            run_on_postgres(DROP_SEARCH_INDEXES),
+        ),
+    ]
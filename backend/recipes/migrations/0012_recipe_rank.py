@@ -0,0 +1,59 @@
+# Generated by Django 3.2 on 2026-10-18 03:09
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+from recipes.ranking import popularity, trending
+
+
+def fill_ranks(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeRank = apps.get_model('recipes', 'RecipeRank')
+    now = timezone.now()
+    ranks = []
+    for recipe_id, pub_date, favorites_count, in_carts_count in (
+        Recipe.objects.values_list(
+            'id', 'pub_date', 'favorites_count', 'in_carts_count'
+        ).iterator()
+    ):
+        score = popularity(favorites_count, in_carts_count)
+        ranks.append(RecipeRank(
+            recipe_id=recipe_id,
+            popularity=score,
+            trending=trending(score, pub_date, now),
+            computed_at=now,
+        ))
+    RecipeRank.objects.bulk_create(ranks, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRank',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popularity', models.FloatField(default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(default=0, verbose_name='Популярность сейчас')),
+                ('computed_at', models.DateTimeField(verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-popularity', '-recipe'], name='rank_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-trending', '-recipe'], name='rank_trending_idx'),
+        ),
+        migrations.RunPython(fill_ranks, migrations.RunPython.noop),
+    ]
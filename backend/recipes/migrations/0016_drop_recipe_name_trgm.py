@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-18 04:10
+
+from django.db import migrations
+
+# Фильтр name снова ищет точное совпадение, которое обслуживает индекс
+# unique_for_author, поэтому триграммный индекс названия из 0006 не нужен.
+
+
+def run_on_postgres(statement):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_cart_ingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgres('DROP INDEX IF EXISTS recipe_name_trgm'),
+            run_on_postgres(
+                'CREATE INDEX IF NOT EXISTS recipe_name_trgm '
+                'ON recipes_recipe USING gin (UPPER(name) gin_trgm_ops)'
+            ),
+        ),
+    ]
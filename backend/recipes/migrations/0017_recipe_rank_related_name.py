@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 03:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_drop_recipe_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reciperank',
+            name='recipe',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 04:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_recipe_rank_related_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FanOutTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_user_id', models.BigIntegerField(default=0, verbose_name='Последний подписчик')),
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fan_out_task', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Раскладка по лентам',
+                'verbose_name_plural': 'Раскладки по лентам',
+            },
+        ),
+    ]
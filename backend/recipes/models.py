@@ -1,8 +1,18 @@
+import os
+import uuid
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core import validators
+from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint
+from django.utils import timezone
+
+from .counters import CounterFieldsMixin
+from .images import validate_recipe_image
 
 User = get_user_model()
 
@@ -63,11 +73,19 @@ class Ingredient(models.Model):
         indexes = [
             models.Index(fields=['name'], name='name_index'),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient',
+            )
+        ]
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель рецептов."""
 
+    counter_fields = ('favorites_count', 'in_carts_count')
+
     name = models.CharField(
         max_length=200,
         help_text='Введите название рецепта'
@@ -77,6 +95,11 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         help_text='Введите дату публикации рецепта',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения',
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор рецепта',
@@ -97,6 +120,12 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='recipes/images/',
+        validators=[validate_recipe_image],
+    )
+    image_renditions = models.JSONField(
+        verbose_name='Варианты картинки',
+        default=dict,
+        editable=False,
     )
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время приготовления (в минутах)',
@@ -108,6 +137,20 @@ class Recipe(models.Model):
             ),
         ],
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         return f'id: {self.id} Автор: {str(self.author)} Название: {self.name}'
@@ -217,3 +260,310 @@ class ShoppingList(FavoritesAndShopping):
                 name='unique_shopping_cart'
             )
         ]
+
+
+class CartIngredient(models.Model):
+    """
+    Итог списка покупок: сколько ингредиента нужно на все рецепты
+    в корзине пользователя. Поддерживается при изменении корзины
+    и ингредиентов рецептов, восстанавливается командой rebuild_carts.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество', default=0
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        default_related_name = 'cart_ingredients'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_cart_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient} {self.amount}'
+
+
+class RecipeRank(models.Model):
+    """
+    Рейтинги рецепта для сортировки списка: за всё время и с затуханием
+    по возрасту рецепта. Пересчитывается командой rank_recipes.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='Рецепт',
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='ranking',
+    )
+    popularity = models.FloatField(verbose_name='Популярность', default=0)
+    trending = models.FloatField(verbose_name='Популярность сейчас', default=0)
+    computed_at = models.DateTimeField(verbose_name='Дата расчёта')
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(
+                fields=['-popularity', '-recipe'], name='rank_popularity_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-recipe'], name='rank_trending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popularity} / {self.trending}'
+
+
+class SimilarRecipe(models.Model):
+    """
+    Похожий рецепт: сосед по косинусной близости TF-IDF векторов
+    ингредиентов и тегов. Таблицу заполняет команда build_similar.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='neighbours',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        verbose_name='Похожий рецепт',
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+    )
+    score = models.FloatField(verbose_name='Близость')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'], name='similar_recipe_score_idx'
+            ),
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id}: {self.score:.3f}'
+
+
+class SimilarRefresh(models.Model):
+    """
+    Рецепт, у которого удалили одного из похожих. Его соседей пересчитает
+    следующий запуск build_similar: после удаления строки, указывавшие
+    на удалённый рецепт, уже не найти.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='Рецепт',
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='similar_refresh',
+    )
+
+    class Meta:
+        verbose_name = 'Пересчёт похожих рецептов'
+        verbose_name_plural = 'Пересчёты похожих рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Рецепт в ленте подписок пользователя. Записи добавляются при публикации
+    рецепта, поэтому лента читается одним диапазоном по индексу.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        default_related_name = 'timeline'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_timeline_entry'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe}'
+
+
+class FanOutTask(models.Model):
+    """
+    Незавершённая раскладка рецепта по лентам. Запрос публикации
+    раскладывает только первую пачку подписчиков, остальных по порядку id
+    дораскладывает команда fan_out, запоминая последнего обработанного.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='fan_out_task',
+    )
+    last_user_id = models.BigIntegerField(
+        verbose_name='Последний подписчик', default=0
+    )
+
+    class Meta:
+        verbose_name = 'Раскладка по лентам'
+        verbose_name_plural = 'Раскладки по лентам'
+
+    def __str__(self):
+        return f'{self.recipe_id} после {self.last_user_id}'
+
+
+class CatalogVersion(models.Model):
+    """
+    Версия справочника: растёт при каждом изменении его строк, в том числе
+    при удалении и загрузке командой load_catalog. Время последнего
+    изменения отдаётся в Last-Modified списка справочника. Строка
+    recipes.ingredientrecipe — версия состава рецептов для индекса
+    «что приготовить».
+    """
+
+    name = models.CharField(
+        verbose_name='Справочник', max_length=100, primary_key=True
+    )
+    version = models.PositiveBigIntegerField(
+        verbose_name='Версия', default=0
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения', default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+    @classmethod
+    def current(cls, model):
+        version, _ = cls.objects.get_or_create(name=model._meta.label_lower)
+        return version
+
+    @classmethod
+    def touch(cls, model):
+        name = model._meta.label_lower
+        if not cls.objects.filter(name=name).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        ):
+            cls.objects.get_or_create(name=name, defaults={'version': 1})
+
+
+class StoredUpload(UploadedFile):
+    """
+    Завершённая загрузка частями как загруженный файл на диске: проверка
+    картинки открывает его по пути, а не копирует в память целиком.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class ImageUpload(models.Model):
+    """
+    Картинка рецепта, загружаемая частями. Данные дописываются в файл
+    во временном каталоге, а рецепт ссылается на готовую загрузку
+    по токену.
+    """
+
+    token = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='image_uploads',
+    )
+    size = models.PositiveIntegerField(verbose_name='Размер файла')
+    offset = models.PositiveIntegerField(
+        verbose_name='Загружено байт', default=0
+    )
+    created = models.DateTimeField(
+        verbose_name='Начало загрузки', auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Загрузка картинки'
+        verbose_name_plural = 'Загрузки картинок'
+
+    def __str__(self):
+        return f'{self.user} - {self.token}'
+
+    @property
+    def path(self):
+        return os.path.join(settings.IMAGE_UPLOAD_DIR, self.token.hex)
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    def write(self, stream, length, chunk_size=1 << 16):
+        """
+        Пишет length байт из потока с текущей позиции и возвращает
+        количество записанных байт. Запрос не держится в памяти целиком.
+        """
+        os.makedirs(settings.IMAGE_UPLOAD_DIR, exist_ok=True)
+        written = 0
+        mode = 'r+b' if os.path.exists(self.path) else 'wb'
+        with open(self.path, mode) as file:
+            file.seek(self.offset)
+            while written < length:
+                chunk = stream.read(min(chunk_size, length - written))
+                if not chunk:
+                    break
+                file.write(chunk)
+                written += len(chunk)
+        return written
+
+    def open(self):
+        file = StoredUpload(
+            open(self.path, 'rb'),
+            name=f'upload-{self.token.hex}',
+            content_type=None,
+            size=self.size,
+            charset=None,
+        )
+        file.upload = self
+        return file
@@ -0,0 +1,39 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+
+def limit_per_group(queryset, field, limit):
+    """
+    Оставляет в queryset не больше limit строк на каждое значение field
+    в порядке сортировки queryset. Строки нумеруются оконной функцией
+    ROW_NUMBER() OVER (PARTITION BY field) в подзапросе, поэтому база
+    отдаёт только нужные строки.
+    """
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    ranked = queryset.order_by().annotate(
+        row_number=Window(
+            RowNumber(),
+            partition_by=F(field),
+            order_by=[
+                F(name[1:]).desc() if name.startswith('-') else F(name).asc()
+                for name in ordering
+            ],
+        )
+    ).values('pk', 'row_number')
+    try:
+        sql, params = ranked.query.sql_with_params()
+    except EmptyResultSet:
+        # Условие вроде author__in=[] заведомо ложно, и SQL не строится.
+        return queryset.none()
+    quote_name = connection.ops.quote_name
+    pk = quote_name(queryset.model._meta.pk.column)
+    return queryset.filter(
+        pk__in=RawSQL(
+            f'SELECT ranked.{pk} FROM ({sql}) ranked '
+            f'WHERE ranked.{quote_name("row_number")} <= %s',
+            (*params, limit),
+        )
+    )
@@ -0,0 +1,75 @@
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Recipe, RecipeRank
+
+FAVORITE_WEIGHT = 1.0
+CART_WEIGHT = 1.0
+# Чем больше показатель, тем быстрее старые рецепты опускаются в trending.
+TRENDING_GRAVITY = 1.8
+
+RANKINGS = {
+    'popular': 'popularity',
+    'trending': 'trending',
+}
+
+
+def popularity(favorites_count, in_carts_count):
+    return FAVORITE_WEIGHT * favorites_count + CART_WEIGHT * in_carts_count
+
+
+def trending(score, pub_date, now):
+    """Популярность, убывающая с возрастом рецепта в часах."""
+    age = max((now - pub_date).total_seconds() / 3600, 0)
+    return score / (age + 2) ** TRENDING_GRAVITY
+
+
+def rank_recipes(batch_size=5000):
+    """
+    Пересчитывает рейтинги всех рецептов по счётчикам избранного и списков
+    покупок. Таблица обновляется на месте пачками: существующие строки
+    обновляются, недостающие вставляются, и сортировка по рейтингу всё
+    время отдаёт рецепты. Строки, которые пересчёт не затронул, удаляются.
+    Рецепт, опубликованный во время пересчёта, сам получает нулевой
+    рейтинг (recipe_published), поэтому вставка пропускает конфликты.
+    Возвращает количество рецептов.
+    """
+    now = timezone.now()
+
+    def ranks():
+        for recipe_id, pub_date, favorites_count, in_carts_count in (
+            Recipe.objects.order_by().values_list(
+                'id', 'pub_date', 'favorites_count', 'in_carts_count'
+            ).iterator(chunk_size=batch_size)
+        ):
+            score = popularity(favorites_count, in_carts_count)
+            yield RecipeRank(
+                recipe_id=recipe_id,
+                popularity=score,
+                trending=trending(score, pub_date, now),
+                computed_at=now,
+            )
+
+    total = 0
+    rows = ranks()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            existing = set(RecipeRank.objects.filter(
+                recipe_id__in=[rank.recipe_id for rank in batch]
+            ).values_list('recipe_id', flat=True))
+            RecipeRank.objects.bulk_update(
+                [rank for rank in batch if rank.recipe_id in existing],
+                ('popularity', 'trending', 'computed_at'),
+            )
+            RecipeRank.objects.bulk_create(
+                [rank for rank in batch if rank.recipe_id not in existing],
+                ignore_conflicts=True,
+            )
+        total += len(batch)
+    RecipeRank.objects.filter(computed_at__lt=now).delete()
+    return total
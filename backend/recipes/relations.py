@@ -0,0 +1,143 @@
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+
+# Отправляются после массовых изменений связей вместо post_save
+# и post_delete на каждую строку: sender — модель связи, field_name —
+# поле объекта, user_id и target_ids — затронутые id.
+relations_added = Signal()
+relations_removed = Signal()
+
+
+def relation_columns(model, field_name):
+    """Таблица связи, её колонки и таблица объекта, на который она ведёт."""
+    quote = connection.ops.quote_name
+    field = model._meta.get_field(field_name)
+    target = field.related_model
+    return (
+        quote(model._meta.db_table),
+        quote(model._meta.pk.column),
+        quote(model._meta.get_field('user').column),
+        quote(field.column),
+        quote(target._meta.db_table),
+        quote(target._meta.pk.column),
+    )
+
+
+def add_relation(model, field_name, user_id, target_id):
+    """
+    Создаёт связь пользователя с объектом одним
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING: строка
+    появляется, только если объект существует и связи ещё нет, поэтому
+    одновременные запросы не приводят к IntegrityError.
+
+    Запрос обходит save(), поэтому post_save отправляется вручную: на нём
+    держатся счётчики, версия взаимодействий и ленты подписок. Возвращает
+    созданную связь или None.
+    """
+    table, pk, user, column, target_table, target_pk = relation_columns(
+        model, field_name
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({user}, {column}) '
+            f'SELECT %s, {target_pk} FROM {target_table} '
+            f'WHERE {target_pk} = %s '
+            f'ON CONFLICT DO NOTHING RETURNING {pk}',
+            [user_id, target_id],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    instance = model(
+        pk=row[0],
+        user_id=user_id,
+        **{model._meta.get_field(field_name).attname: target_id},
+    )
+    post_save.send(
+        sender=model, instance=instance, created=True,
+        update_fields=None, raw=False, using=connection.alias,
+    )
+    return instance
+
+
+def remove_relation(model, field_name, user_id, target_id):
+    """
+    Удаляет связь пользователя с объектом одним DELETE ... RETURNING
+    и отправляет post_delete за обойдённый delete(). Возвращает удалённую
+    связь или None, если её не было.
+    """
+    table, pk, user, column, _, _ = relation_columns(model, field_name)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {user} = %s AND {column} = %s '
+            f'RETURNING {pk}',
+            [user_id, target_id],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    instance = model(
+        pk=row[0],
+        user_id=user_id,
+        **{model._meta.get_field(field_name).attname: target_id},
+    )
+    post_delete.send(
+        sender=model, instance=instance, using=connection.alias
+    )
+    return instance
+
+
+def add_relations(model, field_name, user_id, target_ids):
+    """
+    Создаёт связи пользователя с несколькими объектами одним
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING и отправляет
+    relations_added. Возвращает id объектов, связи с которыми созданы.
+    """
+    if not target_ids:
+        return []
+    table, _, user, column, target_table, target_pk = relation_columns(
+        model, field_name
+    )
+    placeholders = ', '.join(['%s'] * len(target_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({user}, {column}) '
+            f'SELECT %s, {target_pk} FROM {target_table} '
+            f'WHERE {target_pk} IN ({placeholders}) '
+            f'ON CONFLICT DO NOTHING RETURNING {column}',
+            [user_id, *target_ids],
+        )
+        added = [row[0] for row in cursor.fetchall()]
+    if added:
+        relations_added.send(
+            sender=model, field_name=field_name,
+            user_id=user_id, target_ids=added,
+        )
+    return added
+
+
+def remove_relations(model, field_name, user_id, target_ids):
+    """
+    Удаляет связи пользователя с несколькими объектами одним
+    DELETE ... RETURNING и отправляет relations_removed. Возвращает id
+    объектов, связи с которыми удалены.
+    """
+    if not target_ids:
+        return []
+    table, _, user, column, _, _ = relation_columns(model, field_name)
+    placeholders = ', '.join(['%s'] * len(target_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} '
+            f'WHERE {user} = %s AND {column} IN ({placeholders}) '
+            f'RETURNING {column}',
+            [user_id, *target_ids],
+        )
+        removed = [row[0] for row in cursor.fetchall()]
+    if removed:
+        relations_removed.send(
+            sender=model, field_name=field_name,
+            user_id=user_id, target_ids=removed,
+        )
+    return removed
@@ -0,0 +1,93 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+from .models import IngredientRecipe
+
+SEARCH_CONFIG = 'russian'
+
+
+class ORMSearchBackend:
+    """
+    Поиск через icontains. Используется на SQLite и других базах без
+    полнотекстового поиска.
+    """
+
+    def search_recipes(self, queryset, query):
+        """Рецепты с совпадением в названии выше остальных."""
+        in_ingredients = Exists(
+            IngredientRecipe.objects.filter(
+                recipe=OuterRef('pk'), ingredient__name__icontains=query
+            )
+        )
+        return queryset.filter(
+            Q(name__icontains=query)
+            | Q(text__icontains=query)
+            | in_ingredients
+        ).annotate(
+            rank=Case(
+                When(name__icontains=query, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('-rank', '-id')
+
+    def update_search_vectors(self, queryset):
+        """Поисковые векторы хранятся только в PostgreSQL."""
+
+
+class PostgresSearchBackend(ORMSearchBackend):
+    """
+    Полнотекстовый поиск по сохранённому tsvector. Подстрочный поиск
+    (icontains) обслуживают GIN-индексы pg_trgm из миграции 0006.
+    """
+
+    def search_recipes(self, queryset, query):
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-id')
+
+    def update_search_vectors(self, queryset):
+        ingredient_names = Subquery(
+            IngredientRecipe.objects.filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(names=StringAgg('ingredient__name', ' '))
+            .values('names')
+        )
+        queryset.update(
+            search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector(
+                    Coalesce(ingredient_names, Value('')),
+                    weight='B',
+                    config=SEARCH_CONFIG,
+                )
+                + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+            )
+        )
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return ORMSearchBackend()
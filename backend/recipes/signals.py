@@ -0,0 +1,292 @@
+import os
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import Follow, User
+from .carts import (
+    add_to_cart,
+    cart_users,
+    change_recipe_ingredients,
+    rebuild_carts,
+    remove_from_cart,
+)
+from .counters import shift_counter
+from .feed import backfill, fan_out, unfollow
+from .images import process_image
+from .models import (
+    CartIngredient,
+    CatalogVersion,
+    Favorite,
+    ImageUpload,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    RecipeRank,
+    ShoppingList,
+    SimilarRecipe,
+    SimilarRefresh,
+    Tag,
+)
+from .relations import relations_added, relations_removed
+from .search import get_search_backend
+
+# (модель-источник, модель со счётчиком, внешний ключ, поле счётчика)
+COUNTERS = (
+    (Favorite, Recipe, 'recipe', 'favorites_count'),
+    (ShoppingList, Recipe, 'recipe', 'in_carts_count'),
+    (Recipe, User, 'author', 'recipes_count'),
+    (Follow, User, 'author', 'followers_count'),
+)
+
+
+def connect_counter(sender, model, foreign_key, field):
+    """Поддерживает счётчик при создании и удалении строк sender."""
+
+    def target(instance):
+        return model.objects.filter(pk=getattr(instance, f'{foreign_key}_id'))
+
+    def increment(instance, created, **kwargs):
+        if created:
+            shift_counter(target(instance), field, 1)
+
+    def decrement(instance, **kwargs):
+        shift_counter(target(instance), field, -1)
+
+    post_save.connect(increment, sender=sender, weak=False)
+    post_delete.connect(decrement, sender=sender, weak=False)
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
+
+
+@receiver(pre_delete, sender=Recipe)
+def similar_recipe_deleted(sender, instance, **kwargs):
+    """Рецептам, у которых удаляемый был среди похожих, нужен пересчёт."""
+    SimilarRefresh.objects.bulk_create(
+        (
+            SimilarRefresh(recipe_id=recipe_id)
+            for recipe_id in SimilarRecipe.objects.filter(
+                similar=instance
+            ).values_list('recipe_id', flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    """Поднимает версию справочника в той же транзакции, что и изменение."""
+    CatalogVersion.touch(sender)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def interactions_changed(sender, instance, created=True, **kwargs):
+    """Меняет версию избранного, покупок и подписок пользователя."""
+    if created:
+        shift_counter(
+            User.objects.filter(pk=instance.user_id), 'interactions_version', 1
+        )
+
+
+@receiver(relations_added)
+@receiver(relations_removed)
+def relations_changed(sender, signal, field_name, user_id, target_ids,
+                      **kwargs):
+    """
+    Массовое изменение связей: счётчики сдвигаются одним UPDATE на поле,
+    версия взаимодействий пользователя поднимается один раз, ленты
+    подписок дополняются или чистятся сразу по всем авторам.
+    """
+    delta = 1 if signal is relations_added else -1
+    for source, model, foreign_key, field in COUNTERS:
+        if source is sender and foreign_key == field_name:
+            shift_counter(
+                model.objects.filter(pk__in=target_ids), field, delta
+            )
+    shift_counter(
+        User.objects.filter(pk=user_id), 'interactions_version', 1
+    )
+    if sender is Follow:
+        if signal is relations_added:
+            transaction.on_commit(lambda: backfill(user_id, target_ids))
+        else:
+            unfollow(user_id, target_ids)
+    elif sender is ShoppingList:
+        if signal is relations_added:
+            add_to_cart(user_id, target_ids)
+        else:
+            remove_from_cart(user_id, target_ids)
+
+
+@receiver(post_save, sender=ShoppingList)
+def cart_recipe_added(sender, instance, created, **kwargs):
+    if created:
+        add_to_cart(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=ShoppingList)
+def cart_recipe_removed(sender, instance, **kwargs):
+    remove_from_cart(instance.user_id, [instance.recipe_id])
+
+
+def rebuild_recipe_carts(recipe_ids):
+    users = cart_users(recipe_ids)
+    if users:
+        rebuild_carts(user_ids=users)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    """
+    Новый рецепт получает нулевой рейтинг, чтобы сразу попадать
+    в сортировки по популярности, и после фиксации раскладывается
+    по лентам подписчиков.
+    """
+    if created:
+        RecipeRank.objects.create(
+            recipe=instance, computed_at=timezone.now()
+        )
+        transaction.on_commit(
+            lambda: fan_out(instance.pk, instance.author_id)
+        )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: backfill(instance.user_id, [instance.author_id])
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    unfollow(instance.user_id, [instance.author_id])
+
+
+def touch_recipes(**lookup):
+    """Обновляет дату изменения рецептов без вызова save()."""
+    Recipe.objects.filter(**lookup).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_recipes(pk=instance.pk)
+    elif pk_set:
+        touch_recipes(pk__in=pk_set)
+
+
+@receiver(pre_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    """
+    Новая картинка заменяется её очищенным вариантом full в JPEG, рядом
+    сохраняются остальные варианты.
+    """
+    if instance.image and not instance.image._committed:
+        instance.image_renditions = process_image(instance.image)
+        instance.image = instance.image_renditions['full']['jpg']
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@receiver(post_delete, sender=ImageUpload)
+def remove_upload_file(sender, instance, **kwargs):
+    path = instance.path
+    transaction.on_commit(lambda: remove_file(path))
+
+
+def refresh_search_vectors(**lookup):
+    """Пересчитывает поисковые векторы рецептов после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: get_search_backend().update_search_vectors(
+            Recipe.objects.filter(**lookup)
+        )
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    refresh_search_vectors(pk=instance.pk)
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    touch_recipes(pk=instance.recipe_id)
+    refresh_search_vectors(pk=instance.recipe_id)
+
+
+@receiver(post_save, sender=IngredientRecipe)
+def cart_ingredient_saved(sender, instance, created, **kwargs):
+    """
+    Новая строка рецепта прибавляется к корзинам с ним. У изменённой
+    прежнее количество неизвестно, поэтому такие корзины пересобираются.
+    """
+    if created:
+        change_recipe_ingredients(
+            instance.recipe_id, {instance.ingredient_id: instance.amount}
+        )
+    else:
+        rebuild_recipe_carts([instance.recipe_id])
+
+
+@receiver(post_delete, sender=IngredientRecipe)
+def cart_ingredient_deleted(sender, instance, **kwargs):
+    change_recipe_ingredients(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(m2m_changed, sender=IngredientRecipe)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_recipes(pk=instance.pk)
+        refresh_search_vectors(pk=instance.pk)
+        rebuild_recipe_carts([instance.pk])
+    elif pk_set:
+        touch_recipes(pk__in=pk_set)
+        refresh_search_vectors(pk__in=pk_set)
+        rebuild_recipe_carts(pk_set)
+    else:
+        users = list(
+            CartIngredient.objects.filter(ingredient=instance).values_list(
+                'user_id', flat=True
+            )
+        )
+        if users:
+            rebuild_carts(user_ids=users)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(ingredients=instance)
@@ -0,0 +1,193 @@
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from scipy import sparse
+
+from .models import IngredientRecipe, Recipe, SimilarRecipe, SimilarRefresh
+
+# Вес тега относительно ингредиента в векторе рецепта.
+TAG_WEIGHT = 0.5
+# Сколько ячеек плотного блока сходств считается за раз (около 40 МБ).
+BLOCK_CELLS = 10_000_000
+
+
+def fetch_pairs(queryset):
+    """Пары (id рецепта, id признака) в массиве формы (n, 2)."""
+    pairs = np.fromiter(
+        chain.from_iterable(queryset.order_by().iterator()), dtype=np.int64
+    )
+    return pairs.reshape(-1, 2)
+
+
+def load_matrix():
+    """
+    Возвращает отсортированные id рецептов и разреженную матрицу
+    рецепт × признак: ингредиенты и теги с весами TF-IDF, строки
+    нормированы, поэтому их скалярное произведение — косинусная близость.
+    """
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True).iterator(),
+        dtype=np.int64,
+    )
+    ingredients = fetch_pairs(
+        IngredientRecipe.objects.values_list('recipe_id', 'ingredient_id')
+    )
+    tags = fetch_pairs(
+        Recipe.tags.through.objects.values_list('recipe_id', 'tag_id')
+    )
+    _, ingredient_columns = np.unique(ingredients[:, 1], return_inverse=True)
+    _, tag_columns = np.unique(tags[:, 1], return_inverse=True)
+    ingredient_count = (
+        ingredient_columns.max() + 1 if len(ingredient_columns) else 0
+    )
+    columns = np.concatenate(
+        (ingredient_columns, tag_columns + ingredient_count)
+    )
+    rows = np.searchsorted(
+        recipe_ids, np.concatenate((ingredients[:, 0], tags[:, 0]))
+    )
+    weights = np.concatenate((
+        np.ones(len(ingredients), dtype=np.float32),
+        np.full(len(tags), TAG_WEIGHT, dtype=np.float32),
+    ))
+    if not len(columns):
+        return recipe_ids, sparse.csr_matrix(
+            (len(recipe_ids), 0), dtype=np.float32
+        )
+    shape = (len(recipe_ids), int(columns.max()) + 1)
+    matrix = sparse.csr_matrix((weights, (rows, columns)), shape=shape)
+    frequency = np.bincount(columns, minlength=shape[1])
+    idf = np.log((1 + shape[0]) / (1 + frequency)) + 1
+    matrix = matrix @ sparse.diags(idf.astype(np.float32))
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1
+    return recipe_ids, sparse.csr_matrix(
+        sparse.diags(1 / norms) @ matrix, dtype=np.float32
+    )
+
+
+def similarity_blocks(matrix, rows):
+    """Плотные блоки сходства строк rows со всеми рецептами."""
+    transposed = matrix.T.tocsc()
+    block_size = max(1, BLOCK_CELLS // max(matrix.shape[0], 1))
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        yield block, (matrix[block] @ transposed).toarray()
+
+
+def nearest(matrix, rows, top_k):
+    """
+    Для каждой строки из rows возвращает top_k ближайших соседей
+    с положительной близостью: (строка, строки соседей, близости).
+    """
+    k = min(top_k, matrix.shape[0] - 1)
+    if k <= 0:
+        return
+    for block, scores in similarity_blocks(matrix, rows):
+        scores[np.arange(len(block)), block] = 0
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for row, neighbours, neighbour_scores in zip(block, top, top_scores):
+            positive = neighbour_scores > 0
+            yield row, neighbours[positive], neighbour_scores[positive]
+
+
+def store(recipe_ids, matrix, rows, top_k):
+    """Заменяет соседей рецептов из rows. Возвращает число рецептов."""
+    total = 0
+    batch = []
+    for row, neighbours, scores in nearest(matrix, rows, top_k):
+        batch.extend(
+            SimilarRecipe(
+                recipe_id=int(recipe_ids[row]),
+                similar_id=int(recipe_ids[neighbour]),
+                score=float(score),
+            )
+            for neighbour, score in zip(neighbours, scores)
+        )
+        total += 1
+        if len(batch) >= settings.SIMILAR_RECIPES_BATCH:
+            SimilarRecipe.objects.bulk_create(batch)
+            batch = []
+    SimilarRecipe.objects.bulk_create(batch)
+    return total
+
+
+def build_similar(top_k=None):
+    """Пересчитывает соседей всех рецептов."""
+    top_k = top_k or settings.SIMILAR_RECIPES_TOP_K
+    recipe_ids, matrix = load_matrix()
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        SimilarRefresh.objects.all().delete()
+        return store(
+            recipe_ids, matrix, np.arange(len(recipe_ids)), top_k
+        )
+
+
+def existing_rows(recipe_ids, ids):
+    """Номера строк матрицы для тех ids, что ещё есть среди рецептов."""
+    ids = np.unique(np.asarray(list(ids), dtype=np.int64))
+    rows = np.searchsorted(recipe_ids, ids)
+    present = rows < len(recipe_ids)
+    present[present] = recipe_ids[rows[present]] == ids[present]
+    return rows[present]
+
+
+def refresh_similar(changed_ids, top_k=None):
+    """
+    Пересчитывает соседей после изменения нескольких рецептов: самих
+    изменённых, рецептов, у которых они были в соседях, рецептов, для
+    которых изменённый рецепт теперь ближе последнего из сохранённых
+    соседей, и рецептов из SimilarRefresh, потерявших соседа при удалении.
+    Веса IDF при этом пересчитываются по всей матрице, поэтому полную
+    сборку стоит иногда повторять.
+    """
+    top_k = top_k or settings.SIMILAR_RECIPES_TOP_K
+    recipe_ids, matrix = load_matrix()
+    changed_ids = np.unique(np.asarray(list(changed_ids), dtype=np.int64))
+    changed_rows = existing_rows(recipe_ids, changed_ids)
+    refresh_ids = list(
+        SimilarRefresh.objects.values_list('recipe_id', flat=True)
+    )
+    refresh_rows = existing_rows(recipe_ids, refresh_ids)
+    if not len(changed_rows) and not len(refresh_rows):
+        return 0
+
+    threshold = np.zeros(len(recipe_ids), dtype=np.float32)
+    for recipe_id, count, lowest in SimilarRecipe.objects.values_list(
+        'recipe'
+    ).annotate(count=Count('pk'), lowest=Min('score')).order_by().iterator():
+        if count >= top_k:
+            threshold[np.searchsorted(recipe_ids, recipe_id)] = lowest
+    affected = np.zeros(len(recipe_ids), dtype=bool)
+    affected[changed_rows] = True
+    affected[refresh_rows] = True
+    for _, scores in similarity_blocks(matrix, changed_rows):
+        affected |= (scores > threshold).any(axis=0)
+    listed = np.fromiter(
+        SimilarRecipe.objects.filter(similar_id__in=changed_ids.tolist())
+        .values_list('recipe_id', flat=True).distinct().iterator(),
+        dtype=np.int64,
+    )
+    affected[existing_rows(recipe_ids, listed)] = True
+    rows = np.flatnonzero(affected)
+
+    affected_ids = recipe_ids[rows].tolist()
+    batch_size = settings.SIMILAR_RECIPES_BATCH
+    with transaction.atomic():
+        for start in range(0, len(affected_ids), batch_size):
+            SimilarRecipe.objects.filter(
+                recipe_id__in=affected_ids[start:start + batch_size]
+            ).delete()
+        for start in range(0, len(refresh_ids), batch_size):
+            SimilarRefresh.objects.filter(
+                recipe_id__in=refresh_ids[start:start + batch_size]
+            ).delete()
+        return store(recipe_ids, matrix, rows, top_k)
@@ -0,0 +1,80 @@
+from django.core.cache import caches
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from api.authentication import token_users
+from api.pantry import pantry_catalog
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+
+class FoodgramTestMixin:
+    """
+    Общая основа тестов API: кэши процесса очищаются перед каждым тестом,
+    потому что id строк в тестовой базе повторяются.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        token_users.clear()
+        pantry_catalog.clear()
+
+    @staticmethod
+    def make_user(username, **kwargs):
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            first_name=username,
+            last_name=username,
+            password='S3cret-password',
+            **kwargs,
+        )
+
+    @staticmethod
+    def make_recipe(author, name, tags=(), ingredients=(), **kwargs):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            text=f'Как приготовить {name}',
+            cooking_time=10,
+            image='recipes/images/test.jpg',
+            **kwargs,
+        )
+        recipe.tags.set(tags)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients
+        )
+        return recipe
+
+    @staticmethod
+    def make_catalog(tags=2, ingredients=3):
+        return (
+            [
+                Tag.objects.create(
+                    name=f'Тег {index}',
+                    color=f'#00000{index}',
+                    slug=f'tag-{index}',
+                )
+                for index in range(tags)
+            ],
+            [
+                Ingredient.objects.create(
+                    name=f'Ингредиент {index}', measurement_unit='г'
+                )
+                for index in range(ingredients)
+            ],
+        )
+
+
+class FoodgramTestCase(FoodgramTestMixin, APITestCase):
+    pass
+
+
+class FoodgramTransactionTestCase(FoodgramTestMixin, APITransactionTestCase):
+    """
+    Для кода, который читает базу в пуле потоков: данные теста
+    фиксируются, иначе соединения потоков их не видят. Строки из миграций
+    восстанавливаются перед каждым тестом, как и в обычных тестах.
+    """
+    serialized_rollback = True
@@ -0,0 +1,83 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api.autocomplete import ingredient_catalog
+from api.catalog import ingredient_list_response, tag_list_response
+from recipes.models import Tag
+
+from .base import FoodgramTransactionTestCase
+
+
+class AsyncCatalogTest(FoodgramTransactionTestCase):
+    """
+    Справочники под ASGI отвечают так же, как под WSGI, в том числе
+    на запросы с токеном и на запись.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for holder in (
+            tag_list_response, ingredient_list_response, ingredient_catalog
+        ):
+            holder.invalidate()
+        self.make_catalog()
+        self.token = Token.objects.create(user=self.make_user('reader'))
+
+    def request(self, method, name, query='', **headers):
+        """Ответы синхронных и асинхронных адресов на один запрос."""
+        responses = []
+        for urlconf in ('foodgram.urls', 'foodgram.asgi_urls'):
+            with override_settings(ROOT_URLCONF=urlconf):
+                responses.append(getattr(self.client, method)(
+                    reverse(name) + query, **headers
+                ))
+        return responses
+
+    def assertSameResponse(self, method, name, query='', status=200,
+                           **headers):
+        wsgi, asgi = self.request(method, name, query, **headers)
+        self.assertEqual(wsgi.status_code, status)
+        self.assertEqual(asgi.status_code, status)
+        self.assertEqual(asgi.json(), wsgi.json())
+
+    def test_lists(self):
+        for name in ('api:tags-list', 'api:ingredient-list'):
+            with self.subTest(name=name):
+                self.assertSameResponse('get', name)
+
+    def test_search(self):
+        for query in ('?name=Ингр', '?name=%D0%98%D0%BD', '?name=нет'):
+            with self.subTest(query=query):
+                self.assertSameResponse('get', 'api:ingredient-list', query)
+
+    def test_invalid_token(self):
+        for name in ('api:tags-list', 'api:ingredient-list'):
+            with self.subTest(name=name):
+                self.assertSameResponse(
+                    'get', name, status=401,
+                    HTTP_AUTHORIZATION='Token invalid',
+                )
+
+    def test_valid_token(self):
+        for name in ('api:tags-list', 'api:ingredient-list'):
+            with self.subTest(name=name):
+                self.assertSameResponse(
+                    'get', name,
+                    HTTP_AUTHORIZATION=f'Token {self.token.key}',
+                )
+
+    def test_write_is_not_allowed(self):
+        self.assertSameResponse(
+            'post', 'api:tags-list', status=405,
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+
+    def test_catalog_change(self):
+        self.request('get', 'api:tags-list')
+        tag = Tag.objects.get(slug='tag-0')
+        tag.name = 'Новый тег'
+        tag.save()
+        wsgi, asgi = self.request('get', 'api:tags-list')
+        self.assertEqual(asgi.json(), wsgi.json())
+        self.assertIn('Новый тег', [item['name'] for item in asgi.json()])
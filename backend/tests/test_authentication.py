@@ -0,0 +1,94 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api.authentication import CachedTokenAuthentication, token_users
+from users.models import User
+
+from .base import FoodgramTestCase
+
+
+class CachedTokenAuthenticationTest(FoodgramTestCase):
+    """
+    Кэш токенов хранит id пользователя и interactions_version: остальные
+    поля читаются из базы, а сигналы сбрасывают запись при выходе,
+    деактивации и изменении избранного.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('reader')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('api:users-me')
+        self.recipe = self.make_recipe(self.make_user('author'), 'Рецепт')
+
+    def me(self, status=200):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status)
+        return response.data
+
+    def authenticate(self):
+        user, _ = CachedTokenAuthentication().authenticate_credentials(
+            self.token.key
+        )
+        return user
+
+    def test_hit_does_not_query(self):
+        self.me()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user.id, self.user.id)
+            self.assertTrue(user.is_authenticated)
+            self.assertEqual(
+                user.interactions_version, self.user.interactions_version
+            )
+
+    def test_recipes_do_not_query_user(self):
+        # Без кэша токенов было бы на запрос больше, как при первом чтении.
+        for url in (
+            reverse('api:recipes-list'),
+            reverse('api:recipes-detail', args=[self.recipe.id]),
+        ):
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(2):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_other_fields_are_not_stale(self):
+        self.me()
+        User.objects.filter(pk=self.user.pk).update(first_name='Новое имя')
+        self.assertEqual(self.me()['first_name'], 'Новое имя')
+
+    def test_interactions_reset_entry(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('api:recipes-favorite', args=[self.recipe.id])
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(token_users.get(self.token.key))
+        self.user.refresh_from_db()
+        self.assertEqual(
+            self.authenticate().interactions_version,
+            self.user.interactions_version,
+        )
+
+    def test_deleted_token_is_rejected(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.me(status=401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.me()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.me(status=401)
+
+
+@override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+class SharedTokenCacheTest(CachedTokenAuthenticationTest):
+    """То же с записями в общем кэше."""
@@ -0,0 +1,67 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from api.autocomplete import IngredientIndex, ingredient_catalog
+
+from .base import FoodgramTestCase
+
+
+class IngredientIndexTest(SimpleTestCase):
+    """Поиск по индексу ингредиентов в памяти."""
+
+    index = IngredientIndex([
+        (1, 'соль', 'г'),
+        (2, 'морская соль', 'г'),
+        (3, 'сок', 'мл'),
+        (4, 'cola', 'мл'),
+        (5, 'сахар', 'г'),
+    ])
+
+    def names(self, query, limit=10):
+        return [item['name'] for item in self.index.search(query, limit)]
+
+    def test_prefix_before_substring(self):
+        self.assertEqual(self.names('Соль'), ['соль', 'морская соль'])
+
+    def test_layout(self):
+        self.assertEqual(self.names('cjkm'), ['соль', 'морская соль'])
+
+    def test_both_layouts_are_merged(self):
+        # «c» — латинская буква и клавиша «с» в русской раскладке.
+        self.assertEqual(
+            self.names('c'),
+            ['cola', 'сахар', 'сок', 'соль', 'морская соль'],
+        )
+
+    def test_limit(self):
+        self.assertEqual(self.names('c', limit=2), ['cola', 'сахар'])
+        self.assertEqual(self.names('cjkm', limit=1), ['соль'])
+
+    def test_not_found(self):
+        self.assertEqual(self.names('хлеб'), [])
+
+
+class IngredientSearchTest(FoodgramTestCase):
+    """Поиск ингредиентов через API."""
+
+    def setUp(self):
+        super().setUp()
+        ingredient_catalog.invalidate()
+        self.make_catalog(tags=0)
+
+    def search(self, query):
+        response = self.client.get(reverse('api:ingredient-list') + query)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_search(self):
+        self.assertEqual(
+            self.search('?name=Ингредиент 1'), ['Ингредиент 1']
+        )
+        # «byuh» в русской раскладке — «инг».
+        self.assertEqual(self.search('?name=byuh&limit=2'), [
+            'Ингредиент 0', 'Ингредиент 1',
+        ])
+        self.assertEqual(self.search('?name=%D0%98%D0%BD%D0%B3&limit=1'), [
+            'Ингредиент 0',
+        ])
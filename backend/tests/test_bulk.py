@@ -0,0 +1,92 @@
+from django.urls import reverse
+
+from recipes.models import Favorite, ShoppingList
+from users.models import Follow
+
+from .base import FoodgramTestCase
+
+
+class BulkRelationsTest(FoodgramTestCase):
+    """Массовые избранное, корзина и подписки: статус для каждого id."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('reader')
+        self.client.force_authenticate(self.user)
+        self.author = self.make_user('author')
+        self.recipes = [
+            self.make_recipe(self.author, f'Рецепт {index}')
+            for index in range(2)
+        ]
+        self.missing = self.recipes[-1].id + 100
+
+    def send(self, method, url, ids, status=200):
+        response = getattr(self.client, method)(
+            url, {'ids': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, status, response.data)
+        return response.data
+
+    def statuses(self, method, url, ids):
+        return [
+            (item['id'], item['status'])
+            for item in self.send(method, url, ids)
+        ]
+
+    def check_recipe_relation(self, name, model):
+        url = reverse(f'api:recipes-{name}-bulk')
+        first, second = (recipe.id for recipe in self.recipes)
+        self.statuses('post', url, [first])
+        self.assertEqual(
+            self.statuses('post', url, [first, self.missing, second, first]),
+            [
+                (first, 'exists'),
+                (self.missing, 'not_found'),
+                (second, 'added'),
+            ],
+        )
+        self.assertEqual(
+            set(model.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )),
+            {first, second},
+        )
+        self.assertEqual(
+            self.statuses('delete', url, [second, second, self.missing]),
+            [(second, 'removed'), (self.missing, 'not_found')],
+        )
+        self.assertEqual(
+            self.statuses('delete', url, [second]), [(second, 'absent')]
+        )
+
+    def test_favorite(self):
+        self.check_recipe_relation('favorite', Favorite)
+
+    def test_shopping_cart(self):
+        self.check_recipe_relation('shopping-cart', ShoppingList)
+
+    def test_subscribe(self):
+        url = reverse('api:users-subscribe-bulk')
+        self.assertEqual(
+            self.statuses(
+                'post', url, [self.author.id, self.user.id, self.missing]
+            ),
+            [
+                (self.author.id, 'added'),
+                (self.user.id, 'invalid'),
+                (self.missing, 'not_found'),
+            ],
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.author).exists()
+        )
+
+    def test_invalid_ids(self):
+        for url in (
+            reverse('api:recipes-favorite-bulk'),
+            reverse('api:recipes-shopping-cart-bulk'),
+            reverse('api:users-subscribe-bulk'),
+        ):
+            for ids in ([10 ** 20], [0], [], ['abc']):
+                with self.subTest(url=url, ids=ids):
+                    self.send('post', url, ids, status=400)
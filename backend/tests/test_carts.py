@@ -0,0 +1,158 @@
+import io
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from recipes.models import CartIngredient, IngredientRecipe, ShoppingList
+
+from .base import FoodgramTestCase
+
+
+class CartTotalsTest(FoodgramTestCase):
+    """
+    Итоги списка покупок сдвигаются при изменении корзины и ингредиентов
+    рецептов и собираются заново командой rebuild_carts.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('reader')
+        self.client.force_authenticate(self.user)
+        self.author = self.make_user('author')
+        self.stranger = self.make_user('stranger')
+        _, self.ingredients = self.make_catalog()
+        first, second, third = self.ingredients
+        self.soup = self.make_recipe(
+            self.author, 'Суп', ingredients=[first, second]
+        )
+        self.salad = self.make_recipe(
+            self.author, 'Салат', ingredients=[second, third]
+        )
+
+    def totals(self, user=None):
+        return dict(
+            CartIngredient.objects.filter(user=user or self.user)
+            .values_list('ingredient_id', 'amount')
+        )
+
+    def expected(self, *amounts):
+        return {
+            ingredient.id: amount
+            for ingredient, amount in zip(self.ingredients, amounts)
+            if amount
+        }
+
+    def cart(self, method, recipe, status):
+        response = getattr(self.client, method)(
+            reverse('api:recipes-shopping-cart', args=[recipe.id])
+        )
+        self.assertEqual(response.status_code, status)
+
+    def bulk(self, method, *recipes):
+        response = getattr(self.client, method)(
+            reverse('api:recipes-shopping-cart-bulk'),
+            {'ids': [recipe.id for recipe in recipes]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def fill(self, *users):
+        for user in users:
+            ShoppingList.objects.create(user=user, recipe=self.soup)
+
+    def test_add_and_remove(self):
+        self.cart('post', self.soup, 201)
+        self.assertEqual(self.totals(), self.expected(1, 1))
+        self.cart('post', self.salad, 201)
+        self.assertEqual(self.totals(), self.expected(1, 2, 1))
+        self.cart('delete', self.soup, 204)
+        self.assertEqual(self.totals(), self.expected(0, 1, 1))
+        self.cart('delete', self.salad, 204)
+        self.assertFalse(CartIngredient.objects.exists())
+
+    def test_bulk(self):
+        self.bulk('post', self.soup, self.salad)
+        self.assertEqual(self.totals(), self.expected(1, 2, 1))
+        # Повторное добавление не удваивает итоги.
+        self.bulk('post', self.soup)
+        self.assertEqual(self.totals(), self.expected(1, 2, 1))
+        self.bulk('delete', self.salad)
+        self.assertEqual(self.totals(), self.expected(1, 1))
+
+    def test_summary(self):
+        self.bulk('post', self.soup, self.salad)
+        response = self.client.get(
+            reverse('api:recipes-shopping-cart-summary')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['name'], item['amount']) for item in response.data],
+            [('Ингредиент 0', 1), ('Ингредиент 1', 2), ('Ингредиент 2', 1)],
+        )
+
+    def test_recipe_ingredient_added(self):
+        self.fill(self.user)
+        IngredientRecipe.objects.create(
+            recipe=self.soup, ingredient=self.ingredients[2], amount=3
+        )
+        self.assertEqual(self.totals(), self.expected(1, 1, 3))
+        self.assertEqual(self.totals(self.stranger), {})
+
+    def test_recipe_ingredient_changed(self):
+        self.fill(self.user, self.stranger)
+        row = IngredientRecipe.objects.get(
+            recipe=self.soup, ingredient=self.ingredients[0]
+        )
+        row.amount = 4
+        row.save()
+        for user in (self.user, self.stranger):
+            self.assertEqual(self.totals(user), self.expected(4, 1))
+
+    def test_recipe_ingredient_deleted(self):
+        self.fill(self.user)
+        IngredientRecipe.objects.filter(
+            recipe=self.soup, ingredient=self.ingredients[0]
+        ).delete()
+        self.assertEqual(self.totals(), self.expected(0, 1))
+
+    def test_recipe_updated(self):
+        self.fill(self.user)
+        first, _, third = self.ingredients
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            reverse('api:recipes-detail', args=[self.soup.id]),
+            {'ingredients': [
+                {'id': first.id, 'amount': 2},
+                {'id': third.id, 'amount': 5},
+            ]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.totals(), self.expected(2, 0, 5))
+
+    def test_recipe_deleted(self):
+        self.fill(self.user)
+        self.soup.delete()
+        self.assertEqual(self.totals(), {})
+
+    def test_rebuild_carts(self):
+        self.bulk('post', self.soup, self.salad)
+        self.fill(self.stranger)
+        expected = {
+            self.user.id: self.totals(),
+            self.stranger.id: self.totals(self.stranger),
+        }
+        CartIngredient.objects.filter(user=self.user).update(amount=99)
+        CartIngredient.objects.filter(user=self.stranger).delete()
+        CartIngredient.objects.create(
+            user=self.author, ingredient=self.ingredients[0], amount=1
+        )
+        call_command('rebuild_carts', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(
+            {
+                user_id: self.totals(user_id)
+                for user_id in (self.user.id, self.stranger.id)
+            },
+            expected,
+        )
+        self.assertEqual(self.totals(self.author), {})
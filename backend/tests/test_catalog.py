@@ -0,0 +1,107 @@
+import gzip
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from api.catalog import brotli, ingredient_list_response, tag_list_response
+from recipes.models import CatalogVersion, Tag
+
+from .base import FoodgramTestCase
+
+
+class CatalogResponseTest(FoodgramTestCase):
+    """Готовые ответы справочников: ETag, Last-Modified и сжатие."""
+
+    urls = ('api:tags-list', 'api:ingredient-list')
+
+    def setUp(self):
+        super().setUp()
+        tag_list_response.invalidate()
+        ingredient_list_response.invalidate()
+        self.tags, _ = self.make_catalog()
+        # Справочник менялся давно: так видно, что Last-Modified — время
+        # изменения, а не сборки ответа.
+        self.changed_at = timezone.now() - timedelta(days=1)
+        CatalogVersion.objects.update(updated_at=self.changed_at)
+
+    def get(self, name='api:tags-list', status=200, **headers):
+        response = self.client.get(reverse(name), **headers)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    def test_headers(self):
+        for name in self.urls:
+            with self.subTest(name=name):
+                response = self.get(name)
+                self.assertTrue(response['ETag'].startswith('W/"'))
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(
+                    response['Last-Modified'],
+                    http_date(self.changed_at.timestamp()),
+                )
+
+    def test_not_modified(self):
+        response = self.get()
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_NONE_MATCH': response['ETag'][2:]},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ):
+            with self.subTest(headers=headers):
+                not_modified = self.get(status=304, **headers)
+                self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_rebuild_keeps_validators(self):
+        response = self.get()
+        tag_list_response.invalidate()
+        rebuilt = self.get()
+        self.assertEqual(rebuilt['ETag'], response['ETag'])
+        self.assertEqual(rebuilt['Last-Modified'], response['Last-Modified'])
+
+    def assertChanged(self, action):
+        response = self.get()
+        self.change(action)
+        changed = self.get(HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+        self.assertNotEqual(
+            changed['Last-Modified'], response['Last-Modified']
+        )
+
+    def test_saved(self):
+        def rename():
+            self.tags[0].name = 'Новое название'
+            self.tags[0].save()
+
+        self.assertChanged(rename)
+
+    def test_deleted(self):
+        self.assertChanged(self.tags[1].delete)
+
+    def test_other_catalog_is_not_touched(self):
+        response = self.get('api:ingredient-list')
+        self.change(lambda: Tag.objects.create(
+            name='Новый', color='#123456', slug='new'
+        ))
+        self.get(
+            'api:ingredient-list', status=304,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_encodings(self):
+        content = self.get().content
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), content)
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, content)
+        if brotli is not None:
+            response = self.get(HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(response.content), content)
@@ -0,0 +1,151 @@
+import io
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from recipes.counters import shift_counter
+from recipes.models import Favorite, Recipe, ShoppingList
+from users.models import Follow, User
+
+from .base import FoodgramTestCase
+
+
+class CounterSaveTest(FoodgramTestCase):
+    """
+    Сохранение строки, прочитанной до изменения счётчика, не возвращает
+    счётчику прежнее значение.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.user = self.make_user('reader')
+
+    def test_set_password_keeps_followers(self):
+        stale = User.objects.get(pk=self.author.pk)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.client.force_authenticate(stale)
+        response = self.client.post(
+            reverse('api:users-set-password'),
+            {
+                'current_password': 'S3cret-password',
+                'new_password': 'An0ther-password',
+            },
+        )
+        self.assertEqual(response.status_code, 204)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertTrue(self.author.check_password('An0ther-password'))
+
+    def test_full_save_keeps_counters(self):
+        recipe = self.make_recipe(self.author, 'Рецепт')
+        stale = Recipe.objects.get(pk=recipe.pk)
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        stale.name = 'Новое название'
+        stale.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)
+        self.author.first_name = 'Автор'
+        self.author.save()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+        self.assertEqual(self.author.first_name, 'Автор')
+
+
+class CounterColumnsTest(FoodgramTestCase):
+    """
+    Счётчики избранного, корзин, рецептов и подписчиков следуют за
+    одиночными и массовыми изменениями и пересчитываются командой recount.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('reader')
+        self.client.force_authenticate(self.user)
+        self.authors = [self.make_user(f'author{index}') for index in range(2)]
+        self.recipes = [
+            self.make_recipe(self.authors[0], f'Рецепт {index}')
+            for index in range(2)
+        ]
+
+    def count(self, objects, field):
+        return [
+            getattr(type(obj).objects.get(pk=obj.pk), field)
+            for obj in objects
+        ]
+
+    def send(self, method, name, status, pk=None, ids=None):
+        if ids is None:
+            response = getattr(self.client, method)(
+                reverse(name, args=[pk])
+            )
+        else:
+            response = getattr(self.client, method)(
+                reverse(name), {'ids': ids}, format='json'
+            )
+        self.assertEqual(response.status_code, status)
+
+    def check_recipe_counter(self, name, field):
+        first, second = self.recipes
+        self.send('post', f'api:recipes-{name}', 201, pk=first.id)
+        self.assertEqual(self.count(self.recipes, field), [1, 0])
+        self.send(
+            'post', f'api:recipes-{name}-bulk', 200,
+            ids=[first.id, second.id],
+        )
+        self.assertEqual(self.count(self.recipes, field), [1, 1])
+        self.send('delete', f'api:recipes-{name}', 204, pk=second.id)
+        self.assertEqual(self.count(self.recipes, field), [1, 0])
+        self.send(
+            'delete', f'api:recipes-{name}-bulk', 200,
+            ids=[first.id, second.id],
+        )
+        self.assertEqual(self.count(self.recipes, field), [0, 0])
+
+    def test_favorites_count(self):
+        self.check_recipe_counter('favorite', 'favorites_count')
+
+    def test_in_carts_count(self):
+        self.check_recipe_counter('shopping-cart', 'in_carts_count')
+
+    def test_recipes_count(self):
+        self.assertEqual(self.count(self.authors, 'recipes_count'), [2, 0])
+        self.make_recipe(self.authors[1], 'Ещё рецепт')
+        self.recipes[0].delete()
+        self.assertEqual(self.count(self.authors, 'recipes_count'), [1, 1])
+
+    def test_followers_count(self):
+        first, second = self.authors
+        self.send('post', 'api:users-subscribe', 201, pk=first.id)
+        self.assertEqual(self.count(self.authors, 'followers_count'), [1, 0])
+        self.send(
+            'post', 'api:users-subscribe-bulk', 200,
+            ids=[first.id, second.id],
+        )
+        self.assertEqual(self.count(self.authors, 'followers_count'), [1, 1])
+        self.send('delete', 'api:users-subscribe', 204, pk=first.id)
+        self.send('delete', 'api:users-subscribe-bulk', 200, ids=[second.id])
+        self.assertEqual(self.count(self.authors, 'followers_count'), [0, 0])
+
+    def test_counter_is_not_negative(self):
+        recipe = self.recipes[0]
+        shift_counter(
+            Recipe.objects.filter(pk=recipe.pk), 'favorites_count', -1
+        )
+        self.assertEqual(self.count([recipe], 'favorites_count'), [0])
+
+    def test_recount(self):
+        first, second = self.recipes
+        Favorite.objects.create(user=self.user, recipe=first)
+        ShoppingList.objects.create(user=self.user, recipe=second)
+        Follow.objects.create(user=self.user, author=self.authors[1])
+        Recipe.objects.update(favorites_count=5, in_carts_count=0)
+        User.objects.update(recipes_count=3, followers_count=0)
+        call_command('recount', stdout=io.StringIO())
+        self.assertEqual(self.count(self.recipes, 'favorites_count'), [1, 0])
+        self.assertEqual(self.count(self.recipes, 'in_carts_count'), [0, 1])
+        self.assertEqual(self.count(self.authors, 'recipes_count'), [2, 0])
+        self.assertEqual(
+            self.count(self.authors, 'followers_count'), [0, 1]
+        )
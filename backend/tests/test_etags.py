@@ -0,0 +1,70 @@
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe, RecipeRank
+
+from .base import FoodgramTestCase
+
+
+class RecipeListETagTest(FoodgramTestCase):
+    """ETag списка меняется вместе с любым из того, что попадает в ответ."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('reader')
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        author = self.make_user('author')
+        self.recipes = [
+            self.make_recipe(author, f'Рецепт {index}') for index in range(4)
+        ]
+        self.url = reverse('api:recipes-list') + '?limit=2'
+
+    def etag(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        etag = self.etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_on_page_changed(self):
+        etag = self.etag()
+        recipe = self.recipes[-1]
+        recipe.name = 'Новое название'
+        recipe.save()
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_count_changed(self):
+        etag = self.etag()
+        # Рецепт не на этой странице, но count в ответе меняется.
+        self.recipes[0].delete()
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_cursor_links_changed(self):
+        url = f'{self.url}&pagination=cursor'
+        etag = self.etag(url)
+        Recipe.objects.filter(pk__in=[
+            recipe.pk for recipe in self.recipes[:2]
+        ]).delete()
+        # Страница та же, но следующей больше нет.
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_ranking_changed(self):
+        url = f'{self.url}&ordering=popular'
+        etag = self.etag(url)
+        RecipeRank.objects.filter(recipe=self.recipes[0]).update(
+            popularity=10
+        )
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_favorite_changed(self):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse(
+                'api:recipes-favorite', args=[self.recipes[-1].id]
+            ))
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(self.etag(), etag)
@@ -0,0 +1,118 @@
+import io
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from recipes.feed import add_to_timelines
+from recipes.models import FanOutTask, TimelineEntry
+from users.models import Follow
+
+from .base import FoodgramTestCase
+
+
+class FeedTest(FoodgramTestCase):
+    """Лента подписок: раскладка по лентам, чтение и отписка."""
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.make_user('reader')
+        self.client.force_authenticate(self.reader)
+        self.author = self.make_user('author')
+        self.stranger = self.make_user('stranger')
+        self.follow(self.reader, self.author)
+
+    def follow(self, user, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=user, author=author)
+
+    def publish(self, author, count=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                self.make_recipe(author, f'{author.username} {index}')
+                for index in range(count)
+            ]
+
+    def feed_ids(self, limit=2):
+        ids = []
+        url = reverse('api:recipes-feed') + f'?limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def timeline_size(self, user):
+        user.refresh_from_db()
+        return user.timeline_size
+
+    def test_feed(self):
+        recipes = self.publish(self.author, 5)
+        self.publish(self.stranger)
+        self.assertEqual(
+            self.feed_ids(), sorted((r.id for r in recipes), reverse=True)
+        )
+        self.assertEqual(self.timeline_size(self.reader), 5)
+
+    def test_backfill_on_follow(self):
+        recipes = self.publish(self.stranger, 2)
+        self.follow(self.reader, self.stranger)
+        self.assertEqual(
+            self.feed_ids(), sorted((r.id for r in recipes), reverse=True)
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_popular_author_is_merged_on_read(self):
+        self.follow(self.stranger, self.author)
+        popular = self.publish(self.author, 2)
+        self.assertFalse(TimelineEntry.objects.filter(
+            recipe__in=popular
+        ).exists())
+        regular_author = self.make_user('regular')
+        self.follow(self.reader, regular_author)
+        regular = self.publish(regular_author, 2)
+        self.assertEqual(
+            self.feed_ids(limit=3),
+            sorted((r.id for r in popular + regular), reverse=True),
+        )
+
+    @override_settings(FEED_FANOUT_BATCH=2)
+    def test_fan_out_in_batches(self):
+        followers = [self.reader] + [
+            self.make_user(f'follower{index}') for index in range(4)
+        ]
+        for follower in followers[1:]:
+            self.follow(follower, self.author)
+        recipe, = self.publish(self.author)
+        # Сразу раскладывается только первая пачка.
+        self.assertEqual(
+            TimelineEntry.objects.filter(recipe=recipe).count(), 2
+        )
+        self.assertTrue(FanOutTask.objects.filter(recipe=recipe).exists())
+        call_command('fan_out', stdout=io.StringIO())
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(recipe=recipe).values_list(
+                'user_id', flat=True
+            )),
+            {follower.id for follower in followers},
+        )
+        self.assertFalse(FanOutTask.objects.exists())
+
+    def test_repeated_fan_out_keeps_size(self):
+        recipes = self.publish(self.author, 2)
+        add_to_timelines([self.reader.id], [recipe.id for recipe in recipes])
+        self.assertEqual(self.timeline_size(self.reader), 2)
+
+    def test_unfollow(self):
+        self.publish(self.author, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.feed_ids(), [])
+        self.assertEqual(self.timeline_size(self.reader), 0)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse('api:recipes-feed') + '?cursor=cD1hYmM='
+        )
+        self.assertEqual(response.status_code, 404)
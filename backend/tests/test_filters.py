@@ -0,0 +1,41 @@
+from django.urls import reverse
+
+from recipes.models import RecipeRank
+
+from .base import FoodgramTestCase
+
+
+class RecipeFilterTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        author = self.make_user('author')
+        # Поисковые векторы обновляются после коммита.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.borscht = self.make_recipe(author, 'Борщ')
+            self.green = self.make_recipe(author, 'Борщ зелёный')
+            self.make_recipe(author, 'Салат')
+        self.url = reverse('api:recipes-list')
+
+    def ids(self, query):
+        response = self.client.get(f'{self.url}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_is_exact(self):
+        self.assertEqual(self.ids('name=Борщ'), [self.borscht.id])
+        self.assertEqual(self.ids('name=Бор'), [])
+
+    def test_search(self):
+        self.assertEqual(
+            self.ids('search=Борщ'), [self.green.id, self.borscht.id]
+        )
+
+    def test_search_with_ranking(self):
+        RecipeRank.objects.filter(recipe=self.borscht).update(popularity=5)
+        for pagination in ('', '&pagination=cursor'):
+            with self.subTest(pagination=pagination):
+                self.assertEqual(
+                    self.ids(f'search=Борщ&ordering=popular{pagination}'),
+                    [self.borscht.id, self.green.id],
+                )
@@ -0,0 +1,86 @@
+from django.urls import reverse
+
+from api.cache import recipe_cache
+from api.serializers import RecipeFragmentSerializer
+from recipes.models import IngredientRecipe, Recipe
+
+from .base import FoodgramTestCase
+
+
+class RecipeFragmentCacheTest(FoodgramTestCase):
+    """Фрагмент рецепта в кэше не переживает изменений рецепта."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.tags, self.ingredients = self.make_catalog()
+        self.recipe = self.make_recipe(
+            self.author, 'Рецепт',
+            tags=self.tags[:1], ingredients=self.ingredients[:1],
+        )
+        self.url = reverse('api:recipes-detail', args=[self.recipe.id])
+        # Первый запрос кладёт фрагмент в кэш.
+        self.get()
+
+    def get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+        return self.get()
+
+    def test_recipe_saved(self):
+        def rename():
+            self.recipe.name = 'Новое название'
+            self.recipe.save()
+
+        self.assertEqual(self.change(rename)['name'], 'Новое название')
+
+    def test_ingredient_row_changed(self):
+        def change_amount():
+            row = IngredientRecipe.objects.get(recipe=self.recipe)
+            row.amount = 7
+            row.save()
+
+        data = self.change(change_amount)
+        self.assertEqual(data['ingredients'][0]['amount'], 7)
+
+    def test_tags_changed(self):
+        data = self.change(lambda: self.recipe.tags.add(self.tags[1]))
+        self.assertEqual(
+            {tag['id'] for tag in data['tags']},
+            {tag.id for tag in self.tags},
+        )
+
+    def test_tag_cleared(self):
+        data = self.change(lambda: self.tags[0].tags.clear())
+        self.assertEqual(data['tags'], [])
+
+    def test_author_changed(self):
+        def rename():
+            self.author.first_name = 'Новое имя'
+            self.author.save()
+
+        data = self.change(rename)
+        self.assertEqual(data['author']['first_name'], 'Новое имя')
+
+    def test_catalog_changed(self):
+        def rename():
+            self.ingredients[0].name = 'Новый ингредиент'
+            self.ingredients[0].save()
+
+        data = self.change(rename)
+        self.assertEqual(data['ingredients'][0]['name'], 'Новый ингредиент')
+
+    def test_stale_fragment_stored_after_change(self):
+        # Читатель отрисовал рецепт до изменения, а сохранил после.
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        fragment = RecipeFragmentSerializer(stale).data
+        self.recipe.name = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        recipe_cache.set_many([stale], {stale.id: fragment})
+        self.assertEqual(self.get()['name'], 'Новое название')
@@ -0,0 +1,39 @@
+from django.urls import reverse
+
+from .base import FoodgramTestCase
+
+
+class RecipeIdTest(FoodgramTestCase):
+    """Некорректный id рецепта в адресе — это 404, а не ошибка сервера."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('reader')
+        self.client.force_authenticate(self.user)
+        self.recipe = self.make_recipe(self.user, 'Рецепт')
+
+    def test_similar(self):
+        url = reverse('api:recipes-similar', args=[self.recipe.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        for recipe_id in ('abc', '0', '999', '9' * 20):
+            with self.subTest(recipe_id=recipe_id):
+                url = reverse('api:recipes-similar', args=[recipe_id])
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_relation_with_huge_id(self):
+        for name in ('favorite', 'shopping-cart'):
+            url = reverse(f'api:recipes-{name}', args=['9' * 20])
+            for method in ('post', 'delete'):
+                with self.subTest(name=name, method=method):
+                    response = getattr(self.client, method)(url)
+                    self.assertEqual(response.status_code, 404)
+        url = reverse('api:users-subscribe', args=['9' * 20])
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_detail(self):
+        for recipe_id in ('abc', '999', '9' * 20):
+            url = reverse('api:recipes-detail', args=[recipe_id])
+            for method in ('get', 'patch', 'delete'):
+                with self.subTest(recipe_id=recipe_id, method=method):
+                    response = getattr(self.client, method)(url)
+                    self.assertEqual(response.status_code, 404)
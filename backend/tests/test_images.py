@@ -0,0 +1,120 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+
+from recipes.images import process_image, validate_recipe_image
+from recipes.models import Recipe
+
+from .base import FoodgramTestCase
+
+
+def image_file(size=(2000, 1000), image_format='PNG', mode='RGB', **params):
+    output = io.BytesIO()
+    Image.new(mode, size, 'red').save(output, image_format, **params)
+    return SimpleUploadedFile(
+        f'image.{image_format.lower()}', output.getvalue()
+    )
+
+
+class RecipeImageTest(FoodgramTestCase):
+    """Проверка картинки рецепта и её варианты в JPEG и WebP."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(MEDIA_ROOT=directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def open(self, path):
+        with default_storage.open(path) as file:
+            image = Image.open(io.BytesIO(file.read()))
+            image.load()
+            return image
+
+    def test_renditions(self):
+        renditions = process_image(image_file())
+        for name, size in (
+            ('full', (1280, 640)),
+            ('card', (600, 400)),
+            ('thumbnail', (160, 160)),
+        ):
+            for extension, image_format in (('jpg', 'JPEG'), ('webp', 'WEBP')):
+                with self.subTest(name=name, extension=extension):
+                    image = self.open(renditions[name][extension])
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(image.size, size)
+                    self.assertEqual(image.mode, 'RGB')
+
+    def test_metadata_is_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        renditions = process_image(
+            image_file(image_format='JPEG', exif=exif.tobytes())
+        )
+        self.assertNotIn('exif', self.open(renditions['full']['jpg']).info)
+
+    def test_transparency_becomes_white(self):
+        output = io.BytesIO()
+        Image.new('RGBA', (10, 10), (0, 0, 0, 0)).save(output, 'PNG')
+        renditions = process_image(
+            SimpleUploadedFile('image.png', output.getvalue())
+        )
+        image = self.open(renditions['full']['jpg'])
+        self.assertGreater(min(image.getpixel((0, 0))), 240)
+
+    def test_same_content_is_stored_once(self):
+        first = process_image(image_file())
+        directory = os.path.dirname(default_storage.path(first['full']['jpg']))
+        files = sorted(os.listdir(directory))
+        self.assertEqual(len(files), 6)
+        self.assertEqual(process_image(image_file()), first)
+        self.assertEqual(sorted(os.listdir(directory)), files)
+
+    def test_validation(self):
+        validate_recipe_image(image_file())
+        for file in (
+            SimpleUploadedFile('image.png', b'not an image'),
+            image_file(image_format='BMP'),
+        ):
+            with self.subTest(name=file.name):
+                with self.assertRaises(ValidationError):
+                    validate_recipe_image(file)
+        for setting in (
+            {'RECIPE_IMAGE_MAX_PIXELS': 100},
+            {'RECIPE_IMAGE_MAX_SIZE': 10},
+        ):
+            with self.subTest(**setting), override_settings(**setting):
+                with self.assertRaises(ValidationError):
+                    validate_recipe_image(image_file())
+
+    def test_recipe_save(self):
+        recipe = self.make_recipe(self.make_user('author'), 'Рецепт')
+        recipe.image = image_file()
+        recipe.save()
+        self.assertEqual(
+            recipe.image.name, recipe.image_renditions['full']['jpg']
+        )
+        renditions = recipe.image_renditions
+        # Без новой картинки варианты не пересобираются.
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        recipe.name = 'Новое название'
+        recipe.save()
+        self.assertEqual(recipe.image_renditions, renditions)
+        response = self.client.get(
+            reverse('api:recipes-detail', args=[recipe.id])
+        )
+        self.assertTrue(
+            response.data['images']['card']['webp'].endswith(
+                renditions['card']['webp']
+            )
+        )
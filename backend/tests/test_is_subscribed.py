@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from users.models import Follow
+
+from .base import FoodgramTestCase
+
+
+class IsSubscribedTest(FoodgramTestCase):
+    """
+    is_subscribed берётся из множества авторов читателя, которое читается
+    один раз на запрос и сбрасывается при изменении подписок.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.make_user('reader')
+        token = Token.objects.create(user=self.reader)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.authors = [self.make_user(f'author{index}') for index in range(3)]
+        for author in self.authors:
+            self.make_recipe(author, f'Рецепт {author.username}')
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+
+    def subscribed(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        return {
+            item['username']: item['is_subscribed']
+            for item in (
+                [recipe['author'] for recipe in results]
+                if url.startswith(reverse('api:recipes-list')) else results
+            )
+            if item['username'].startswith('author')
+        }
+
+    def test_users_and_recipe_authors(self):
+        expected = {'author0': True, 'author1': False, 'author2': False}
+        for url in (reverse('api:users-list'), reverse('api:recipes-list')):
+            with self.subTest(url=url):
+                self.assertEqual(self.subscribed(url), expected)
+
+    def test_follows_are_read_once(self):
+        url = reverse('api:users-list')
+        counts = []
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.subscribed(url)
+            counts.append(len([
+                query for query in queries
+                if Follow._meta.db_table in query['sql']
+            ]))
+            self.make_user(f'author{len(self.authors) + len(counts)}')
+        # Второй запрос берёт множество из кэша.
+        self.assertEqual(counts, [1, 0])
+
+    def test_subscribe_resets_set(self):
+        url = reverse('api:users-list')
+        self.subscribed(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('api:users-subscribe', args=[self.authors[1].id])
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(self.subscribed(url)['author1'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(
+                reverse('api:users-subscribe', args=[self.authors[0].id])
+            )
+        self.assertFalse(self.subscribed(url)['author0'])
+
+    def test_anonymous(self):
+        self.client.credentials()
+        self.assertEqual(
+            set(self.subscribed(reverse('api:users-list')).values()), {False}
+        )
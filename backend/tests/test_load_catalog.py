@@ -0,0 +1,141 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+
+from recipes.models import CatalogVersion, Ingredient, Tag
+
+from .base import FoodgramTestCase
+
+
+class LoadCatalogTest(FoodgramTestCase):
+    """
+    Загрузка справочников: повторный запуск ничего не меняет, повторы
+    в файле не дублируют строки, цвета тегов остаются уникальными.
+    Под PostgreSQL ингредиенты загружаются через COPY, под SQLite —
+    пачками bulk_create.
+    """
+
+    ingredients = [
+        {'name': 'Ингредиент 0', 'measurement_unit': 'г'},
+        {'name': 'Ингредиент 1', 'measurement_unit': 'мл'},
+        {'name': 'Ингредиент 1', 'measurement_unit': 'мл'},
+        {'name': 'Ингредиент 1', 'measurement_unit': 'кг'},
+        {'name': 'Ингредиент 2'},
+    ]
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        tags, _ = self.make_catalog(tags=3, ingredients=1)
+        self.tags = [
+            {'name': tag.name, 'slug': tag.slug, 'color': tag.color}
+            for tag in tags
+        ]
+
+    def load(self, tags=None, ingredients=None, batch_size=2):
+        paths = {}
+        for name, items in (
+            ('tags', self.tags if tags is None else tags),
+            ('ingredients', (
+                self.ingredients if ingredients is None else ingredients
+            )),
+        ):
+            paths[name] = self.directory / f'{name}.json'
+            paths[name].write_text(json.dumps(items), encoding='utf-8')
+        stdout = io.StringIO()
+        call_command(
+            'load_catalog', batch_size=batch_size, stdout=stdout, **paths
+        )
+        return stdout.getvalue()
+
+    def colors(self):
+        return dict(Tag.objects.values_list('slug', 'color'))
+
+    def ingredient_rows(self):
+        return set(Ingredient.objects.filter(
+            name__startswith='Ингредиент'
+        ).values_list('name', 'measurement_unit'))
+
+    def test_rerun_changes_nothing(self):
+        output = self.load()
+        # Ингредиент 0 уже есть, второй Ингредиент 1 в мл — повтор,
+        # у Ингредиента 2 нет единицы измерения.
+        self.assertIn(
+            'Ингредиенты: добавлено 2, обновлено 0, пропущено 3', output
+        )
+        self.assertIn('Теги: добавлено 0, обновлено 0, пропущено 3', output)
+        rows = {
+            ('Ингредиент 0', 'г'),
+            ('Ингредиент 1', 'мл'),
+            ('Ингредиент 1', 'кг'),
+        }
+        self.assertEqual(self.ingredient_rows(), rows)
+        output = self.load()
+        self.assertIn(
+            'Ингредиенты: добавлено 0, обновлено 0, пропущено 5', output
+        )
+        self.assertIn('Теги: добавлено 0, обновлено 0, пропущено 3', output)
+        self.assertEqual(self.ingredient_rows(), rows)
+
+    def test_versions(self):
+        def versions():
+            return [
+                CatalogVersion.current(model).version
+                for model in (Ingredient, Tag)
+            ]
+
+        before = versions()
+        self.load(tags=self.tags + [
+            {'name': 'перекус', 'slug': 'snack', 'color': '#123456'},
+        ])
+        after = versions()
+        self.assertEqual(after, [before[0] + 1, before[1] + 1])
+        self.load()
+        self.assertEqual(versions(), after)
+
+    def test_new_and_changed_tags(self):
+        tags = self.tags + [
+            {'name': 'перекус', 'slug': 'snack', 'color': '#123456'},
+            {'name': 'перекус', 'slug': 'snack', 'color': '#123456'},
+        ]
+        tags[0] = dict(tags[0], name='ранний завтрак')
+        output = self.load(tags=tags)
+        self.assertIn('Теги: добавлено 1, обновлено 1, пропущено 3', output)
+        self.assertEqual(
+            Tag.objects.get(slug=tags[0]['slug']).name, 'ранний завтрак'
+        )
+
+    def test_swapped_colors(self):
+        first, second, third = self.tags
+        tags = [
+            dict(first, color=second['color']),
+            dict(second, color=third['color']),
+            dict(third, color=first['color']),
+        ]
+        self.load(tags=tags)
+        colors = self.colors()
+        for tag in tags:
+            self.assertEqual(colors[tag['slug']], tag['color'])
+
+    def test_color_conflicts(self):
+        first, second, _ = self.tags
+        for tags in (
+            # Цвет занят тегом, которого нет в файле.
+            [dict(first, color=second['color'])],
+            # Один цвет у двух тегов из файла.
+            [dict(first, color='#123456'), dict(second, color='#123456')],
+            # Один slug с разными данными.
+            [first, dict(first, color='#123456')],
+        ):
+            with self.subTest(tags=tags):
+                colors, rows = self.colors(), self.ingredient_rows()
+                with self.assertRaises(CommandError):
+                    self.load(tags=tags)
+                self.assertEqual(self.colors(), colors)
+                # Ингредиенты загружаются в той же транзакции.
+                self.assertEqual(self.ingredient_rows(), rows)
@@ -0,0 +1,98 @@
+from django.urls import reverse
+
+from recipes.models import Recipe, RecipeRank
+
+from .base import FoodgramTestCase
+
+
+class KeysetPaginationTest(FoodgramTestCase):
+    """
+    Курсор сортировки по рейтингу хранит (score, id), поэтому рецепты
+    с одинаковым рейтингом не повторяются и не пропускаются.
+    """
+
+    def setUp(self):
+        super().setUp()
+        author = self.make_user('author')
+        self.recipes = [
+            self.make_recipe(author, f'Рецепт {index}') for index in range(7)
+        ]
+        RecipeRank.objects.filter(
+            recipe__in=self.recipes[2:4]
+        ).update(popularity=5)
+        self.url = (
+            reverse('api:recipes-list')
+            + '?ordering=popular&pagination=cursor&limit=2'
+        )
+
+    def expected(self, recipes):
+        ranked = {recipe.id for recipe in self.recipes[2:4]}
+        return sorted(
+            (recipe.id for recipe in recipes if recipe.id is not None),
+            key=lambda recipe_id: (recipe_id in ranked, recipe_id),
+            reverse=True,
+        )
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_walks_all_pages(self):
+        ids = []
+        url = self.url
+        while url:
+            page = self.get(url)
+            ids += [recipe['id'] for recipe in page['results']]
+            url = page['next']
+        self.assertEqual(ids, self.expected(self.recipes))
+
+    def test_previous_page(self):
+        first = self.get(self.url)
+        second = self.get(first['next'])
+        self.assertEqual(self.get(second['previous'])['results'],
+                         first['results'])
+
+    def rest_after_change(self, change):
+        """
+        Id рецептов после второй страницы, которая кончается внутри группы
+        с нулевым рейтингом, если между запросами выполнить change.
+        """
+        first = self.get(self.url)
+        second = self.get(first['next'])
+        shown = [
+            recipe['id'] for recipe in first['results'] + second['results']
+        ]
+        change(second['results'])
+        ids = []
+        url = second['next']
+        while url:
+            page = self.get(url)
+            ids += [recipe['id'] for recipe in page['results']]
+            url = page['next']
+        expected = [
+            recipe_id for recipe_id in self.expected(self.recipes)
+            if recipe_id not in shown
+        ]
+        return ids, expected
+
+    def test_deleted_row_does_not_skip(self):
+        ids, expected = self.rest_after_change(
+            lambda page: Recipe.objects.filter(pk=page[0]['id']).delete()
+        )
+        self.assertEqual(ids, expected)
+
+    def test_new_row_does_not_repeat(self):
+        # Новый рецепт встаёт в уже показанную часть группы.
+        ids, expected = self.rest_after_change(
+            lambda page: self.make_recipe(self.recipes[0].author, 'Новый')
+        )
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        # p=nonsense, p=[1,2 и p=["x", 1].
+        for cursor in (
+            'cD1ub25zZW5zZQ==', 'cD1bMSwy', 'cD0lNUIlMjJ4JTIyJTJDKzElNUQ='
+        ):
+            response = self.client.get(f'{self.url}&cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,162 @@
+import numpy as np
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from api.pantry import PantryCatalog, PantryIndex, pantry_catalog
+from recipes.models import CatalogVersion, IngredientRecipe
+
+from .base import FoodgramTestCase
+
+
+class PantryIndexTest(SimpleTestCase):
+    """Ранжирование по инвертированному индексу и overlay изменений."""
+
+    def setUp(self):
+        self.index = PantryIndex(
+            np.array([[1, 1], [1, 2], [2, 1], [2, 2], [2, 3], [3, 1], [4, 4]]),
+            timezone.now(),
+            0,
+        )
+
+    def rank(self, index, ingredient_ids, count=10):
+        ids, matched, sizes, total = index.rank(ingredient_ids, count)
+        return ids.tolist(), matched.tolist(), sizes.tolist(), total
+
+    def test_order(self):
+        # Сначала без недостающих, среди равных — самые новые.
+        self.assertEqual(
+            self.rank(self.index, [1, 2]), ([3, 1, 2], [1, 2, 2], [1, 2, 3], 3)
+        )
+
+    def test_coverage_breaks_ties(self):
+        self.assertEqual(self.rank(self.index, [1])[0], [3, 1, 2])
+        self.assertEqual(self.rank(self.index, [3])[0], [2])
+        self.assertEqual(self.rank(self.index, [1, 3])[0], [3, 2, 1])
+
+    def test_count(self):
+        self.assertEqual(self.rank(self.index, [1, 2], 1), ([3], [1], [1], 3))
+
+    def test_unknown_ingredient(self):
+        self.assertEqual(self.rank(self.index, [9]), ([], [], [], 0))
+
+    def test_overlay(self):
+        index = self.index.with_changes(
+            {2: frozenset({5}), 4: frozenset({1, 2}), 7: frozenset({1})},
+            timezone.now(),
+            1,
+        )
+        self.assertEqual(
+            self.rank(index, [1, 2]),
+            ([7, 4, 3, 1], [1, 2, 1, 2], [1, 2, 1, 2], 4),
+        )
+        self.assertEqual(self.rank(index, [4]), ([], [], [], 0))
+        # Исходный индекс не меняется.
+        self.assertEqual(self.rank(self.index, [4])[0], [4])
+
+
+class PantryTest(FoodgramTestCase):
+    """Поиск «что приготовить» и догрузка изменённых рецептов."""
+
+    url = reverse('api:recipes-pantry')
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        _, self.ingredients = self.make_catalog(ingredients=4)
+        self.full = self.make_recipe(
+            self.author, 'Полный', ingredients=self.ingredients[:2]
+        )
+        self.partial = self.make_recipe(
+            self.author, 'Неполный', ingredients=self.ingredients[:3]
+        )
+        self.other = self.make_recipe(
+            self.author, 'Другой', ingredients=self.ingredients[3:]
+        )
+
+    def search(self, *ingredients, **params):
+        response = self.client.get(self.url, {
+            'ingredients': ','.join(str(i.id) for i in ingredients),
+            **params,
+        })
+        self.assertEqual(response.status_code, 200)
+        return [
+            (item['id'], item['matched_count'], item['missing_count'])
+            for item in response.data
+        ]
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    def test_search(self):
+        self.assertEqual(self.search(*self.ingredients[:2]), [
+            (self.full.id, 2, 0),
+            (self.partial.id, 2, 1),
+        ])
+        self.assertEqual(
+            self.search(*self.ingredients[:2], limit=1), [(self.full.id, 2, 0)]
+        )
+
+    def test_invalid_ingredients(self):
+        for value in ('', 'abc'):
+            with self.subTest(value=value):
+                response = self.client.get(self.url, {'ingredients': value})
+                self.assertEqual(response.status_code, 400)
+
+    def test_ingredient_added(self):
+        self.search(self.ingredients[3])
+        self.change(lambda: IngredientRecipe.objects.create(
+            recipe=self.full, ingredient=self.ingredients[3], amount=1
+        ))
+        self.assertEqual(self.search(self.ingredients[3]), [
+            (self.other.id, 1, 0),
+            (self.full.id, 1, 2),
+        ])
+
+    def test_ingredient_removed(self):
+        self.search(self.ingredients[0])
+        self.change(lambda: IngredientRecipe.objects.filter(
+            recipe=self.full, ingredient=self.ingredients[0]
+        ).delete())
+        self.assertEqual(
+            self.search(self.ingredients[0]), [(self.partial.id, 1, 2)]
+        )
+
+    def test_recipe_added(self):
+        self.search(self.ingredients[3])
+        recipe = self.make_recipe(self.author, 'Новый')
+        self.change(lambda: IngredientRecipe.objects.create(
+            recipe=recipe, ingredient=self.ingredients[3], amount=1
+        ))
+        self.assertEqual(
+            self.search(self.ingredients[3]),
+            [(recipe.id, 1, 0), (self.other.id, 1, 0)],
+        )
+
+    def test_recipe_deleted(self):
+        self.search(self.ingredients[0])
+        self.change(self.full.delete)
+        self.assertEqual(
+            self.search(self.ingredients[0]), [(self.partial.id, 1, 2)]
+        )
+
+    def test_version_is_shared(self):
+        # Другой процесс со своим индексом видит ту же версию в базе.
+        other = PantryCatalog()
+        index = other.get()
+        self.change(lambda: IngredientRecipe.objects.create(
+            recipe=self.other, ingredient=self.ingredients[0], amount=1
+        ))
+        version = CatalogVersion.current(IngredientRecipe).version
+        self.assertGreater(version, index.version)
+        synced = other.get()
+        self.assertEqual(synced.version, version)
+        self.assertIn(
+            self.other.id, synced.rank([self.ingredients[0].id], 10)[0]
+        )
+
+    def test_fresh_index_reads_only_version(self):
+        pantry_catalog.get()
+        with self.assertNumQueries(1):
+            pantry_catalog.get()
@@ -0,0 +1,78 @@
+from django.core.cache import caches
+from django.urls import reverse
+
+from .base import FoodgramTestCase
+
+
+class RecipeQueryBudgetTest(FoodgramTestCase):
+    """
+    Число запросов к базе при чтении рецептов не зависит от их количества
+    на странице: автор, теги и ингредиенты догружаются пачками, а рецепты
+    из кэша фрагментов не догружаются вовсе.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.user = self.make_user('reader')
+        self.tags, self.ingredients = self.make_catalog()
+        self.recipes = [
+            self.make_recipe(
+                self.author, f'Рецепт {index}',
+                tags=self.tags, ingredients=self.ingredients,
+            )
+            for index in range(6)
+        ]
+        self.list_url = reverse('api:recipes-list')
+        self.detail_url = reverse(
+            'api:recipes-detail', args=[self.recipes[0].id]
+        )
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_anonymous(self):
+        # COUNT, страница, теги, ингредиенты.
+        response = self.get(self.list_url, 4)
+        self.assertEqual(len(response.data['results']), 6)
+        self.get(self.list_url, 2)
+
+    def test_list_authenticated(self):
+        self.client.force_authenticate(self.user)
+        # И подписки пользователя.
+        self.get(self.list_url, 5)
+        self.get(self.list_url, 2)
+
+    def test_list_does_not_grow_with_page(self):
+        for index in range(6, 100):
+            self.make_recipe(
+                self.author, f'Рецепт {index}',
+                tags=self.tags, ingredients=self.ingredients,
+            )
+        for limit in (1, 6, 100):
+            with self.subTest(limit=limit):
+                # Без кэша фрагментов, иначе часть рецептов не читается.
+                for cache in caches.all():
+                    cache.clear()
+                response = self.get(f'{self.list_url}?limit={limit}', 4)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_ranked_list(self):
+        self.get(f'{self.list_url}?ordering=popular', 4)
+
+    def test_cursor_list(self):
+        # Без COUNT.
+        self.get(f'{self.list_url}?pagination=cursor', 3)
+
+    def test_detail(self):
+        # Дата изменения для ETag, рецепт, теги, ингредиенты.
+        self.get(self.detail_url, 4)
+        self.get(self.detail_url, 2)
+
+    def test_detail_authenticated(self):
+        self.client.force_authenticate(self.user)
+        self.get(self.detail_url, 5)
+        self.get(self.detail_url, 2)
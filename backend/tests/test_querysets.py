@@ -0,0 +1,48 @@
+from recipes.models import Recipe
+from recipes.querysets import limit_per_group
+
+from .base import FoodgramTestCase
+
+
+class LimitPerGroupTest(FoodgramTestCase):
+    """Не больше limit строк на группу в порядке сортировки queryset."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = {}
+        for author_index, count in enumerate((4, 2, 0)):
+            author = self.make_user(f'author{author_index}')
+            self.recipes[author.id] = [
+                self.make_recipe(author, f'Рецепт {author_index}.{index}')
+                for index in range(count)
+            ]
+
+    def names(self, queryset):
+        return sorted(queryset.values_list('name', flat=True))
+
+    def test_limit(self):
+        queryset = Recipe.objects.filter(author__in=self.recipes)
+        self.assertEqual(self.names(limit_per_group(queryset, 'author', 3)), [
+            'Рецепт 0.1', 'Рецепт 0.2', 'Рецепт 0.3',
+            'Рецепт 1.0', 'Рецепт 1.1',
+        ])
+
+    def test_ordering(self):
+        queryset = Recipe.objects.order_by('name')
+        self.assertEqual(self.names(limit_per_group(queryset, 'author', 1)), [
+            'Рецепт 0.0', 'Рецепт 1.0',
+        ])
+
+    def test_filter_is_kept(self):
+        queryset = Recipe.objects.filter(name__endswith='.0')
+        self.assertEqual(
+            self.names(limit_per_group(queryset, 'author', 5)),
+            ['Рецепт 0.0', 'Рецепт 1.0'],
+        )
+
+    def test_empty_filter(self):
+        queryset = Recipe.objects.filter(author__in=[])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                list(limit_per_group(queryset, 'author', 3)), []
+            )
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+from recipes import ranking
+from recipes.models import Recipe, RecipeRank
+
+from .base import FoodgramTestCase
+
+
+class RankRecipesTest(FoodgramTestCase):
+    """Пересчёт рейтингов на месте и сортировка по ним."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.recipes = [
+            self.make_recipe(self.author, f'Рецепт {index}')
+            for index in range(3)
+        ]
+        Recipe.objects.filter(pk=self.recipes[0].pk).update(favorites_count=2)
+
+    def popularity(self):
+        return dict(
+            RecipeRank.objects.values_list('recipe_id', 'popularity')
+        )
+
+    def test_updates_and_inserts(self):
+        RecipeRank.objects.filter(recipe=self.recipes[1]).delete()
+        self.assertEqual(ranking.rank_recipes(batch_size=2), 3)
+        self.assertEqual(self.popularity(), {
+            self.recipes[0].id: 2.0,
+            self.recipes[1].id: 0.0,
+            self.recipes[2].id: 0.0,
+        })
+
+    def test_rank_inserted_during_ranking(self):
+        # Строку рейтинга вставляет recipe_published, пока пересчёт идёт.
+        late = self.recipes[-1]
+        RecipeRank.objects.filter(recipe=late).delete()
+        trending = ranking.trending
+
+        def publish(*args):
+            RecipeRank.objects.get_or_create(
+                recipe=late, defaults={'computed_at': timezone.now()}
+            )
+            return trending(*args)
+
+        with mock.patch.object(ranking, 'trending', publish):
+            self.assertEqual(ranking.rank_recipes(batch_size=1), 3)
+        self.assertEqual(set(self.popularity()), {
+            recipe.id for recipe in self.recipes
+        })
+
+    def test_unranked_recipe_is_listed(self):
+        RecipeRank.objects.filter(recipe=self.recipes[1]).delete()
+        ranking.rank_recipes()
+        RecipeRank.objects.filter(recipe=self.recipes[1]).delete()
+        response = self.client.get(
+            reverse('api:recipes-list') + '?ordering=popular'
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[0].id, self.recipes[2].id, self.recipes[1].id],
+        )
@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from recipes.models import IngredientRecipe, Recipe
+
+from .base import FoodgramTestCase
+
+
+class RecipeUpdateTest(FoodgramTestCase):
+    """
+    Изменение рецепта сверяет теги и ингредиенты с сохранёнными и трогает
+    только отличающиеся строки.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.client.force_authenticate(self.author)
+        self.tags, self.ingredients = self.make_catalog(tags=3)
+        self.recipe = self.make_recipe(
+            self.author, 'Рецепт',
+            tags=self.tags[:2], ingredients=self.ingredients[:2],
+        )
+        self.url = reverse('api:recipes-detail', args=[self.recipe.id])
+
+    def rows(self):
+        return {
+            row.ingredient_id: (row.id, row.amount)
+            for row in IngredientRecipe.objects.filter(recipe=self.recipe)
+        }
+
+    def patch(self, ingredients, tags):
+        response = self.client.patch(self.url, {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in ingredients
+            ],
+            'tags': [tag.id for tag in tags],
+            'text': 'Новый текст',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_unchanged_rows_are_kept(self):
+        rows = self.rows()
+        self.patch(
+            [(ingredient, 1) for ingredient in self.ingredients[:2]],
+            self.tags[:2],
+        )
+        self.assertEqual(self.rows(), rows)
+        self.assertEqual(
+            list(self.recipe.tags.order_by('id')), self.tags[:2]
+        )
+
+    def test_diff(self):
+        first, second, third = self.ingredients
+        rows = self.rows()
+        data = self.patch([(first, 1), (second, 5), (third, 2)],
+                          self.tags[1:])
+        updated = self.rows()
+        self.assertEqual(updated[first.id], rows[first.id])
+        self.assertEqual(updated[second.id], (rows[second.id][0], 5))
+        self.assertEqual(updated[third.id][1], 2)
+        self.assertEqual(
+            {tag['id'] for tag in data['tags']},
+            {tag.id for tag in self.tags[1:]},
+        )
+        self.patch([(third, 2)], self.tags[1:])
+        self.assertEqual(list(self.rows()), [third.id])
+
+
+class RecipeTouchTest(FoodgramTestCase):
+    """Изменения тегов и ингредиентов сдвигают updated_at рецепта."""
+
+    def setUp(self):
+        super().setUp()
+        self.tags, self.ingredients = self.make_catalog()
+        self.recipe = self.make_recipe(
+            self.make_user('author'), 'Рецепт',
+            tags=self.tags[:1], ingredients=self.ingredients[:1],
+        )
+
+    def assertTouched(self, action):
+        past = timezone.now() - timedelta(days=1)
+        Recipe.objects.filter(pk=self.recipe.pk).update(updated_at=past)
+        action()
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, past)
+
+    def test_tags(self):
+        tag = self.tags[1]
+        for action in (
+            lambda: self.recipe.tags.add(tag),
+            lambda: self.recipe.tags.remove(tag),
+            lambda: tag.tags.add(self.recipe),
+            lambda: tag.tags.remove(self.recipe),
+            lambda: self.recipe.tags.clear(),
+        ):
+            with self.subTest(action=action):
+                self.assertTouched(action)
+
+    def test_ingredient_rows(self):
+        row = IngredientRecipe.objects.get(recipe=self.recipe)
+
+        def change_amount():
+            row.amount = 3
+            row.save()
+
+        for action in (
+            change_amount,
+            lambda: IngredientRecipe.objects.create(
+                recipe=self.recipe, ingredient=self.ingredients[1], amount=1
+            ),
+            lambda: self.recipe.ingredients.remove(self.ingredients[1]),
+            lambda: self.ingredients[2].ingredients.add(
+                self.recipe, through_defaults={'amount': 1}
+            ),
+            row.delete,
+        ):
+            with self.subTest(action=action):
+                self.assertTouched(action)
@@ -0,0 +1,84 @@
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import RecipeCreateSerializer
+
+from .base import FoodgramTestCase
+
+
+class RecipeValidationTest(FoodgramTestCase):
+    """
+    Id ингредиентов и тегов рецепта проверяются одним запросом на список,
+    сколько бы их ни было.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.client.force_authenticate(self.author)
+        self.tags, self.ingredients = self.make_catalog(tags=3, ingredients=5)
+        self.recipe = self.make_recipe(
+            self.author, 'Рецепт',
+            tags=self.tags[:1], ingredients=self.ingredients[:1],
+        )
+        self.url = reverse('api:recipes-detail', args=[self.recipe.id])
+
+    def data(self, ingredient_ids, tag_ids, amount=1):
+        return {
+            'ingredients': [
+                {'id': ingredient_id, 'amount': amount}
+                for ingredient_id in ingredient_ids
+            ],
+            'tags': tag_ids,
+        }
+
+    def errors(self, ingredient_ids, tag_ids, amount=1):
+        response = self.client.patch(
+            self.url, self.data(ingredient_ids, tag_ids, amount),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        return str(response.data)
+
+    def test_queries_do_not_grow(self):
+        request = APIRequestFactory().patch(self.url)
+        request.user = self.author
+        for count in (1, 3, 5):
+            serializer = RecipeCreateSerializer(
+                self.recipe,
+                data=self.data(
+                    [ingredient.id for ingredient in self.ingredients[:count]],
+                    [tag.id for tag in self.tags[:min(count, 3)]],
+                ),
+                partial=True,
+                context={'request': request},
+            )
+            with self.subTest(count=count), self.assertNumQueries(2):
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_unknown_ids(self):
+        ingredient, tag = self.ingredients[0].id, self.tags[0].id
+        self.assertIn(
+            'Ингредиенты не найдены: 999998, 999999',
+            self.errors([ingredient, 999999, 999998], [tag]),
+        )
+        self.assertIn(
+            'Теги не найдены: 999999', self.errors([ingredient], [tag, 999999])
+        )
+
+    def test_duplicates(self):
+        ingredient, tag = self.ingredients[0].id, self.tags[0].id
+        self.assertIn(
+            'Ингредиенты не могут повторяться',
+            self.errors([ingredient, ingredient], [tag]),
+        )
+        self.assertIn(
+            'Нельзя использовать повторяющиеся теги',
+            self.errors([ingredient], [tag, tag]),
+        )
+
+    def test_empty_and_amount(self):
+        ingredient, tag = self.ingredients[0].id, self.tags[0].id
+        self.assertIn('без ингредиентов', self.errors([], [tag]))
+        self.assertIn('без тегов', self.errors([ingredient], []))
+        self.assertIn('amount', self.errors([ingredient], [tag], amount=0))
@@ -0,0 +1,104 @@
+import csv
+import io
+import unittest
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.urls import reverse
+import reportlab
+
+from api.renderers import register_font
+
+from .base import FoodgramTestCase
+
+
+def cyrillic_font_installed():
+    try:
+        register_font(settings.SHOPPING_LIST_FONT)
+    except ImproperlyConfigured:
+        return False
+    return True
+
+
+class ShoppingListExportTest(FoodgramTestCase):
+    """Выгрузка списка покупок в txt, csv и pdf."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('buyer')
+        self.client.force_authenticate(self.user)
+        author = self.make_user('author')
+        _, self.ingredients = self.make_catalog(tags=0, ingredients=2)
+        for name, ingredients in (
+            ('Первый', self.ingredients),
+            ('Второй', self.ingredients[:1]),
+        ):
+            recipe = self.make_recipe(author, name, ingredients=ingredients)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    reverse('api:recipes-shopping-cart', args=[recipe.id])
+                )
+        self.url = reverse('api:recipes-download-shopping-cart')
+
+    def download(self, query='', status=200, **headers):
+        response = self.client.get(self.url + query, **headers)
+        self.assertEqual(response.status_code, status)
+        if not response.streaming:
+            return response, response.content
+        return response, b''.join(response.streaming_content)
+
+    def test_txt(self):
+        response, content = self.download()
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; charset=utf-8'
+        )
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="shopping_list.txt"',
+        )
+        text = content.decode()
+        self.assertIn('Список покупок пользователя: buyer', text)
+        self.assertIn('- Ингредиент 0 (г) - 2\n- Ингредиент 1 (г) - 1', text)
+
+    def test_csv(self):
+        response, content = self.download('?format=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        text = content.decode()
+        self.assertTrue(text.startswith('﻿'))
+        self.assertEqual(list(csv.reader(io.StringIO(text[1:]))), [
+            ['Ингредиент', 'Единица измерения', 'Количество'],
+            ['Ингредиент 0', 'г', '2'],
+            ['Ингредиент 1', 'г', '1'],
+        ])
+
+    def test_accept_header(self):
+        response, _ = self.download(HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+    def test_unknown_format(self):
+        self.download('?format=xml', status=404)
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+        self.download(status=401)
+
+    @unittest.skipUnless(
+        cyrillic_font_installed(), 'Нет шрифта с кириллицей'
+    )
+    def test_pdf(self):
+        response, content = self.download('?format=pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertTrue(content.rstrip().endswith(b'%%EOF'))
+
+    def test_pdf_without_cyrillic_font(self):
+        # Vera из комплекта reportlab без кириллицы.
+        vera = Path(reportlab.__file__).parent / 'fonts' / 'Vera.ttf'
+        for path in ('/nonexistent/font.ttf', str(vera)):
+            with self.subTest(path=path), override_settings(
+                SHOPPING_LIST_FONT=path
+            ):
+                with self.assertRaises(ImproperlyConfigured):
+                    self.download('?format=pdf')
@@ -0,0 +1,118 @@
+import numpy as np
+from django.test import SimpleTestCase
+from scipy import sparse
+
+from recipes.models import SimilarRecipe, SimilarRefresh
+from recipes.similarity import (
+    build_similar,
+    nearest,
+    refresh_similar,
+    store,
+)
+
+from .base import FoodgramTestCase
+
+
+class NearestTest(SimpleTestCase):
+    """Ближайшие соседи по нормированной матрице признаков."""
+
+    matrix = sparse.csr_matrix(np.array([
+        [1, 0, 0],
+        [0.8, 0.6, 0],
+        [0.6, 0.8, 0],
+        [0, 0, 1],
+    ], dtype=np.float32))
+
+    def neighbours(self, rows, top_k):
+        return {
+            int(row): (
+                neighbours.tolist(),
+                [round(float(score), 2) for score in scores],
+            )
+            for row, neighbours, scores in nearest(
+                self.matrix, np.asarray(rows), top_k
+            )
+        }
+
+    def test_order_and_self(self):
+        self.assertEqual(self.neighbours([0, 1], 2), {
+            0: ([1, 2], [0.8, 0.6]),
+            1: ([2, 0], [0.96, 0.8]),
+        })
+
+    def test_zero_scores_are_dropped(self):
+        self.assertEqual(self.neighbours([3], 2), {3: ([], [])})
+
+    def test_top_k_is_capped(self):
+        self.assertEqual(len(self.neighbours([0], 10)[0][0]), 3 - 1)
+
+    def test_single_recipe(self):
+        self.assertEqual(
+            list(nearest(self.matrix[:1], np.asarray([0]), 5)), []
+        )
+
+
+class SimilarRecipesTest(FoodgramTestCase):
+    """Таблица похожих рецептов: сборка, пересчёт и удаление."""
+
+    def setUp(self):
+        super().setUp()
+        author = self.make_user('author')
+        _, ingredients = self.make_catalog(tags=0, ingredients=3)
+        self.recipes = {
+            name: self.make_recipe(author, name, ingredients=[
+                ingredients[index] for index in indexes
+            ])
+            for name, indexes in (
+                ('a', (0, 1, 2)),
+                ('b', (1, 2)),
+                ('c', (0,)),
+            )
+        }
+
+    def neighbours(self):
+        names = {recipe.id: name for name, recipe in self.recipes.items()}
+        return {
+            names[recipe_id]: names[similar_id]
+            for recipe_id, similar_id in SimilarRecipe.objects.values_list(
+                'recipe_id', 'similar_id'
+            )
+        }
+
+    def test_store(self):
+        recipe_ids = np.asarray(
+            [recipe.id for recipe in self.recipes.values()]
+        )
+        matrix = sparse.csr_matrix(np.eye(3, dtype=np.float32) + 0.1)
+        self.assertEqual(store(recipe_ids, matrix, np.asarray([0, 2]), 1), 2)
+        self.assertEqual(SimilarRecipe.objects.count(), 2)
+        self.assertTrue(SimilarRecipe.objects.filter(
+            recipe=self.recipes['a'], score__gt=0
+        ).exists())
+
+    def test_build(self):
+        self.assertEqual(build_similar(top_k=1), 3)
+        self.assertEqual(self.neighbours(), {'a': 'b', 'b': 'a', 'c': 'a'})
+
+    def test_refresh_changed(self):
+        build_similar(top_k=1)
+        recipe = self.recipes['c']
+        recipe.ingredients.set(
+            self.recipes['b'].ingredients.all(),
+            through_defaults={'amount': 1},
+        )
+        refresh_similar([recipe.id], top_k=1)
+        self.assertEqual(self.neighbours()['c'], 'b')
+        self.assertEqual(self.neighbours()['b'], 'c')
+
+    def test_refresh_after_delete(self):
+        build_similar(top_k=1)
+        self.recipes.pop('b').delete()
+        self.assertEqual(
+            list(SimilarRefresh.objects.values_list('recipe_id', flat=True)),
+            [self.recipes['a'].id],
+        )
+        # Удалённых рецептов среди изменённых уже нет.
+        refresh_similar([], top_k=1)
+        self.assertEqual(self.neighbours(), {'a': 'c', 'c': 'a'})
+        self.assertFalse(SimilarRefresh.objects.exists())
@@ -0,0 +1,56 @@
+from django.urls import reverse
+
+from users.models import Follow
+
+from .base import FoodgramTestCase
+
+
+class SubscriptionsTest(FoodgramTestCase):
+    """Рецепты авторов в списке подписок и параметр recipes_limit."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('reader')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('api:users-subscriptions')
+
+    def get(self, query=''):
+        response = self.client.get(f'{self.url}{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def follow(self, *recipe_counts):
+        for index, count in enumerate(recipe_counts):
+            author = self.make_user(f'author{index}')
+            for number in range(count):
+                self.make_recipe(author, f'Рецепт {index}.{number}')
+            Follow.objects.create(user=self.user, author=author)
+
+    def test_no_subscriptions(self):
+        for query in (
+            '', '?recipes_limit=3', '?recipes_limit=0',
+            '?page=1&limit=6&recipes_limit=3',
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.get(query), [])
+
+    def test_recipes_limit(self):
+        self.follow(4, 1)
+        authors = self.get('?recipes_limit=3')
+        self.assertEqual(
+            [len(author['recipes']) for author in authors], [3, 1]
+        )
+
+    def test_zero_limit(self):
+        self.follow(2)
+        with self.assertNumQueries(3):
+            # COUNT, страница авторов и подписки для is_subscribed,
+            # рецепты не читаются.
+            authors = self.get('?recipes_limit=0')
+        self.assertEqual(authors[0]['recipes'], [])
+
+    def test_invalid_limit_is_ignored(self):
+        self.follow(2)
+        for query in ('?recipes_limit=-1', '?recipes_limit=abc'):
+            with self.subTest(query=query):
+                self.assertEqual(len(self.get(query)[0]['recipes']), 2)
@@ -0,0 +1,107 @@
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+
+from api.serializers import RecipeCreateSerializer
+from recipes.models import ImageUpload, Recipe
+
+from .base import FoodgramTestCase
+
+
+def noise_png(width, height):
+    """PNG из случайных пикселей: почти не сжимается, поэтому большой."""
+    output = io.BytesIO()
+    Image.frombytes(
+        'RGB', (width, height), os.urandom(width * height * 3)
+    ).save(output, 'PNG', compress_level=1)
+    return output.getvalue()
+
+
+class ChunkedUploadTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(
+            MEDIA_ROOT=os.path.join(directory, 'media'),
+            IMAGE_UPLOAD_DIR=os.path.join(directory, 'uploads'),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = self.make_user('author')
+        self.client.force_authenticate(self.user)
+        self.tags, self.ingredients = self.make_catalog()
+
+    def upload(self, content, chunk_size=1 << 20):
+        response = self.client.post(
+            reverse('api:uploads-list'), {'size': len(content)}
+        )
+        self.assertEqual(response.status_code, 201)
+        url = reverse('api:uploads-detail', args=[response.data['token']])
+        for offset in range(0, len(content), chunk_size):
+            response = self.client.generic(
+                'PATCH', url, content[offset:offset + chunk_size],
+                content_type='application/offset+octet-stream',
+                HTTP_UPLOAD_OFFSET=str(offset),
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['offset'], len(content))
+        return response.data['token']
+
+    def create_recipe(self, token):
+        return self.client.post(
+            reverse('api:recipes-list'),
+            {
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 5,
+                'tags': [self.tags[0].id],
+                'ingredients': [
+                    {'id': self.ingredients[0].id, 'amount': 1}
+                ],
+                'image': f'upload:{token}',
+            },
+            format='json',
+        )
+
+    def test_large_upload_is_not_read_into_memory(self):
+        content = noise_png(1200, 1100)
+        token = self.upload(content)
+        field = RecipeCreateSerializer(
+            context={'request': SimpleNamespace(user=self.user)}
+        ).fields['image']
+        tracemalloc.start()
+        try:
+            file = field.run_validation(f'upload:{token}')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        file.close()
+        # Копия файла в BytesIO весила бы столько же, сколько сам файл.
+        self.assertLess(peak, len(content) // 2)
+
+    def test_recipe_from_upload(self):
+        token = self.upload(noise_png(400, 300), chunk_size=100_000)
+        response = self.create_recipe(token)
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get()
+        self.assertEqual(
+            set(recipe.image_renditions), {'full', 'card', 'thumbnail'}
+        )
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_incomplete_upload(self):
+        response = self.client.post(
+            reverse('api:uploads-list'), {'size': 100}
+        )
+        response = self.create_recipe(response.data['token'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
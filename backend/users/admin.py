@@ -14,9 +14,10 @@ class UserAdmin(BaseUserAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
     )
     search_fields = ('username', 'email')
-    list_editable = ('password',)
     readonly_fields = ('last_login', 'date_joined',)
 
 
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='interactions_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия избранного, покупок и подписок'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_interactions_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timeline_size',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Записей в ленте подписок'),
+        ),
+    ]
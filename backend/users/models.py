@@ -2,10 +2,19 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 
+from recipes.counters import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     """Модель пользователя."""
 
+    counter_fields = (
+        'recipes_count',
+        'followers_count',
+        'interactions_version',
+        'timeline_size',
+    )
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
         'username',
@@ -39,6 +48,26 @@ class User(AbstractUser):
         null=True,
         blank=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+    interactions_version = models.PositiveIntegerField(
+        verbose_name='Версия избранного, покупок и подписок',
+        default=0,
+        editable=False,
+    )
+    timeline_size = models.PositiveIntegerField(
+        verbose_name='Записей в ленте подписок',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         constraints = [
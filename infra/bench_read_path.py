@@ -0,0 +1,139 @@
+"""
+Нагрузочный замер чтения API: запросы в секунду и задержки p50/p99.
+
+Запускается отдельно против WSGI- и ASGI-развёртывания с одинаковым
+числом воркеров (то есть при одинаковом бюджете памяти), например:
+
+    gunicorn foodgram.wsgi:application --workers 2 --bind 0:8000
+    gunicorn foodgram.asgi:application --workers 2 --bind 0:8001 \\
+        -k uvicorn.workers.UvicornWorker
+
+    python bench_read_path.py http://localhost:8000 --token <токен>
+    python bench_read_path.py http://localhost:8001 --token <токен>
+
+Нужна только стандартная библиотека.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import quote, urlsplit
+
+PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=са',
+    '/api/recipes/?limit=6',
+    '/api/recipes/?limit=6&ordering=popular',
+    '/api/recipes/{recipe_id}/',
+    '/api/recipes/download_shopping_cart/?format=txt',
+)
+
+
+async def read_response(reader):
+    """Читает ответ, возвращает код и признак закрытия соединения."""
+    status = int((await reader.readline()).split()[1])
+    length = None
+    chunked = False
+    close = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+        elif name == 'connection' and 'close' in value.lower():
+            close = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, close
+
+
+async def client(host, port, requests, deadline, latencies, errors):
+    """
+    Шлёт запросы по кругу до deadline. Синхронные воркеры gunicorn
+    закрывают соединение после ответа, тогда оно открывается заново
+    и это время входит в задержку.
+    """
+    writer = None
+    index = 0
+    try:
+        while time.monotonic() < deadline:
+            request = requests[index % len(requests)]
+            index += 1
+            started = time.perf_counter()
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            status, close = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+            if close:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def run(options):
+    url = urlsplit(options.url)
+    headers = f'Host: {url.netloc}\r\nConnection: keep-alive\r\n'
+    if options.token:
+        headers += f'Authorization: Token {options.token}\r\n'
+    requests = [
+        (
+            f'GET {quote(path.format(recipe_id=options.recipe_id), "/?&=")}'
+            f' HTTP/1.1\r\n'
+            f'{headers}\r\n'
+        ).encode()
+        for path in options.paths
+    ]
+    latencies, errors = [], []
+    deadline = time.monotonic() + options.warmup
+    await asyncio.gather(*(
+        client(url.hostname, url.port or 80, requests, deadline, [], [])
+        for _ in range(options.concurrency)
+    ))
+    started = time.monotonic()
+    deadline = started + options.duration
+    await asyncio.gather(*(
+        client(url.hostname, url.port or 80, requests, deadline,
+               latencies, errors)
+        for _ in range(options.concurrency)
+    ))
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    print(
+        f'{options.url}: {len(latencies) / elapsed:.1f} запросов/с, '
+        f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+        f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} мс, '
+        f'ошибок {len(errors)} из {len(latencies)}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('url')
+    parser.add_argument('--token', help='Токен пользователя.')
+    parser.add_argument('--recipe-id', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--paths', nargs='+', default=PATHS)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()